@@ -14,13 +14,33 @@ Optional: rembg (auto-installs if background removal is selected)
 Built by Digital Harmony Group
 """
 
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import io
+import itertools
 import json
 import math
 import os
+import platform
+import re
+import select
+import shutil
+import signal
+import struct
 import subprocess
 import sys
 import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
 
 # ---------------------------------------------------------------------------
 # Dependency check — the platform launcher (.command / .bat) installs these
@@ -41,15 +61,24 @@ except ImportError:
     print("❌ Pillow is not installed." + _LAUNCH_HINT)
     sys.exit(1)
 
+try:
+    import numpy as np  # installed alongside rembg/onnxruntime by the launchers
+except ImportError:
+    np = None
+
 try:
     import tkinter as tk
     from tkinter import ttk, filedialog, messagebox
 except ImportError:
+    tk = None  # Only the GUI needs it; the command line runs without
+
+
+def _tkinter_missing():
     print("❌ tkinter is not available." + _LAUNCH_HINT)
     if sys.platform == "darwin":
         pyver = f"{sys.version_info.major}.{sys.version_info.minor}"
         print(f"\n  On macOS with Homebrew, also run:  brew install python-tk@{pyver}")
-    sys.exit(1)
+    print("\n  Or run headless: python batch_resize_headshots.py --help")
 
 # ---------------------------------------------------------------------------
 # Image processing engine (self-contained — no external script dependency)
@@ -90,10 +119,11 @@ def multi_stop_color(colors, t):
 GRADIENT_DIRECTIONS = {'down', 'right', 'diagonal', 'radial'}
 
 
-def parse_bg_spec(bg_str: str) -> dict:
+def parse_bg_spec(bg_str: str, files: bool = True) -> dict:
+    """Background spec dict for a colour, gradient, TRANSPARENT or (with files) image path."""
     if bg_str.upper() == 'TRANSPARENT':
         return {'type': 'transparent'}
-    if os.path.isfile(bg_str):
+    if files and os.path.isfile(bg_str):
         return {'type': 'image', 'path': bg_str}
     parts = bg_str.split(':')
     hex_parts = [p for p in parts if is_hex_color(p)]
@@ -109,7 +139,8 @@ def parse_bg_spec(bg_str: str) -> dict:
     return {'type': 'solid', 'color': '#FFFFFF'}
 
 
-def create_gradient(width, height, colors, direction='down'):
+def _create_gradient_python(width, height, colors, direction='down'):
+    """Pixel-by-pixel reference renderer (used when numpy is unavailable)."""
     img = Image.new('RGB', (width, height))
     draw = ImageDraw.Draw(img)
     if direction == 'down':
@@ -140,18 +171,319 @@ def create_gradient(width, height, colors, direction='down'):
     return img
 
 
-def create_background(bg_spec, width, height):
+# Diagonal and radial gradients are colored through a lookup table indexed by
+# quantized position. 65536 entries keep every channel within ±1 of the
+# per-pixel reference renderer for any number of stops.
+_GRADIENT_LUT_SIZE = 65536
+
+# Large canvases are rendered and composited in horizontal bands of at most
+# this many pixels, so working memory tracks band height, not canvas area.
+BAND_PIXELS = 2_000_000
+LARGE_CANVAS_PIXELS = 16_000_000
+
+
+def _band_rows(width):
+    return max(1, BAND_PIXELS // max(width, 1))
+
+
+def _gradient_positions(width, height, direction, top=0, bottom=None):
+    """Gradient position t (0–1) for rows top..bottom, as a broadcastable array.
+
+    Uses the same formulas as _create_gradient_python. 'down' and 'right' are
+    1-D (float64, exact); 'diagonal' and 'radial' are full 2-D float32 grids.
+    """
+    bottom = height if bottom is None else bottom
+    if direction == 'down':
+        return (np.arange(top, bottom, dtype=np.float64) / max(height - 1, 1))[:, None]
+    if direction == 'right':
+        return (np.arange(width, dtype=np.float64) / max(width - 1, 1))[None, :]
+    ys = np.arange(top, bottom, dtype=np.float32)[:, None]
+    xs = np.arange(width, dtype=np.float32)[None, :]
+    if direction == 'diagonal':
+        t = np.sqrt(xs * xs + ys * ys)
+        t *= np.float32(1 / math.sqrt(width ** 2 + height ** 2))
+        return t
+    # radial
+    cx, cy = width / 2, height / 2
+    xs -= np.float32(cx)
+    ys -= np.float32(cy)
+    t = np.sqrt(xs * xs + ys * ys)
+    t *= np.float32(1 / math.sqrt(cx ** 2 + cy ** 2))
+    return np.minimum(t, np.float32(1.0), out=t)
+
+
+def _multi_stop_array(colors, t):
+    """Vectorized multi_stop_color: map an array of positions to uint8 RGB."""
+    out = np.empty(t.shape + (3,), dtype=np.uint8)
+    if len(colors) == 1:
+        out[...] = colors[0]
+        return out
+    n = len(colors) - 1
+    stops = np.asarray(colors, dtype=np.float64)
+    scaled = t * n
+    segment = np.minimum(scaled.astype(np.intp), n - 1)
+    local_t = scaled - segment
+    for i in range(3):
+        start = stops[:-1, i][segment]
+        delta = np.diff(stops[:, i])[segment]
+        # Truncate like lerp_color's int() — every value is non-negative
+        out[..., i] = start + delta * local_t
+    return out
+
+
+def _gradient_bands(width, height, colors, direction):
+    """Yield (top, rgb) for successive bands of the gradient.
+
+    Each rgb is a contiguous uint8 (rows, width, 3) array of at most
+    BAND_PIXELS pixels; the banding never changes a pixel's value.
+    """
+    lut = None
+    if direction in ('diagonal', 'radial') and width > 1 and height > 1:
+        last = _GRADIENT_LUT_SIZE - 1
+        lut = _multi_stop_array(colors, np.arange(_GRADIENT_LUT_SIZE) / last)
+    rows = _band_rows(width)
+    for top in range(0, height, rows):
+        bottom = min(top + rows, height)
+        t = _gradient_positions(width, height, direction, top, bottom)
+        if lut is not None:
+            t *= _GRADIENT_LUT_SIZE - 1
+            rgb = np.take(lut, np.rint(t, out=t).astype(np.uint16), axis=0)
+        else:
+            rgb = _multi_stop_array(colors, t)
+            rgb = np.ascontiguousarray(np.broadcast_to(rgb, (bottom - top, width, 3)))
+        yield top, rgb
+
+
+def create_gradient(width, height, colors, direction='down', mode='RGB'):
+    """Render a multi-stop gradient in any of GRADIENT_DIRECTIONS.
+
+    Vectorized with numpy and rendered band by band straight into a canvas of
+    the requested mode; falls back to the per-pixel reference renderer when
+    numpy is not installed.
+    """
+    if np is None:
+        img = _create_gradient_python(width, height, colors, direction)
+        return img if img.mode == mode else img.convert(mode)
+    if direction not in GRADIENT_DIRECTIONS:
+        return Image.new(mode, (width, height))
+    img = None
+    for top, rgb in _gradient_bands(width, height, colors, direction):
+        band = Image.fromarray(rgb)
+        if top == 0 and band.height == height and mode == 'RGB':
+            return band
+        if img is None:
+            img = Image.new(mode, (width, height))
+        img.paste(band, (0, top))
+    return img
+
+
+def create_background(bg_spec, width, height, mode=None):
+    """Render a background canvas. mode defaults to the spec's natural mode."""
     if bg_spec['type'] == 'solid':
         color = hex_to_rgb(bg_spec['color'])
-        return Image.new('RGB', (width, height), color)
+        return Image.new(mode or 'RGB', (width, height), color)
     elif bg_spec['type'] == 'gradient':
-        return create_gradient(width, height, bg_spec['colors'], bg_spec['direction'])
+        return create_gradient(width, height, bg_spec['colors'], bg_spec['direction'],
+                               mode=mode or 'RGB')
     elif bg_spec['type'] == 'image':
-        bg = Image.open(bg_spec['path']).convert('RGB')
-        return ImageOps.fit(bg, (width, height), method=Image.LANCZOS)
+        bg = load_backdrop(bg_spec['path'])
+        canvas = ImageOps.fit(bg, (width, height), method=Image.LANCZOS)
+        return canvas.convert(mode) if mode and mode != canvas.mode else canvas
     elif bg_spec['type'] == 'transparent':
         return Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    return Image.new('RGB', (width, height), (255, 255, 255))
+    return Image.new(mode or 'RGB', (width, height), (255, 255, 255))
+
+
+# ---------------------------------------------------------------------------
+# Background canvas cache
+# ---------------------------------------------------------------------------
+# A canvas depends only on the background spec and the target size, so every
+# image in a batch — and every workflow — can share a single render.
+
+BACKGROUND_CACHE_BYTES = 256 * 1024 * 1024
+BACKDROP_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class ImageLRU:
+    """Byte-bounded LRU cache of PIL images, safe to share between threads.
+
+    Sizes are counted as width × height × bands. Images larger than the whole
+    budget are never stored.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @staticmethod
+    def _size_of(img):
+        return img.width * img.height * len(img.getbands())
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def put(self, key, img):
+        size = self._size_of(img)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size_of(old)
+            self._items[key] = img
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= self._size_of(evicted)
+                self.evictions += 1
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                self._bytes -= self._size_of(self._items.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return self.hits, self.misses, self.evictions
+
+    def add_stats(self, hits, misses, evictions):
+        """Count lookups made elsewhere, e.g. by a worker process's copy of the cache."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def summary(self):
+        return (f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions "
+                f"({len(self._items)} cached, {self._bytes / 1_048_576:.1f} MB)")
+
+
+_background_cache = ImageLRU(BACKGROUND_CACHE_BYTES)
+# Decoded 'image' backdrops, keyed by (path, mtime, size) so an edited file
+# is decoded again and its fitted canvases stop matching.
+_backdrop_cache = ImageLRU(BACKDROP_CACHE_BYTES)
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def load_backdrop(path):
+    """Decode a background image file once and reuse it until the file changes."""
+    stamp = _file_stamp(path)
+    img = _backdrop_cache.get(stamp)
+    if img is None:
+        _backdrop_cache.discard(lambda key: key[0] == stamp[0])
+        with Image.open(path) as src:
+            img = src.convert('RGB')
+        _backdrop_cache.put(stamp, img)
+    return img
+
+
+def _background_key(bg_spec, width, height):
+    """Normalize a bg spec so equivalent specs share one cache entry."""
+    kind = bg_spec['type']
+    if kind == 'solid':
+        ident = bg_spec['color'].lstrip('#').upper()
+    elif kind == 'gradient':
+        ident = (tuple(tuple(c) for c in bg_spec['colors']), bg_spec['direction'])
+    elif kind == 'image':
+        ident = _file_stamp(bg_spec['path'])
+    else:
+        ident = None
+    return (kind, ident, width, height)
+
+
+def get_background(bg_spec, width, height, mode=None):
+    """Return a private copy of the background canvas, rendering it at most once.
+
+    When mode is given the canvas is converted on the way out, which already
+    produces a new image and saves the extra copy.
+    """
+    if width * height * 3 > _background_cache.max_bytes:
+        # Too big to cache — render directly in the final mode, no extra copy
+        return create_background(bg_spec, width, height, mode)
+    key = _background_key(bg_spec, width, height)
+    canvas = _background_cache.get(key)
+    if canvas is None:
+        canvas = create_background(bg_spec, width, height)
+        _background_cache.put(key, canvas)
+    if mode and canvas.mode != mode:
+        return canvas.convert(mode)
+    return canvas.copy()
+
+
+# ---------------------------------------------------------------------------
+# Decode planning
+# ---------------------------------------------------------------------------
+# JPEGs can be decoded at 1/2, 1/4 or 1/8 scale straight from the DCT data.
+# The planner asks for the smallest decode that still leaves DRAFT_MARGIN×
+# the pixels the final LANCZOS resample needs.
+
+DRAFT_MARGIN = 2.0
+_EXIF_ORIENTATION = 0x0112
+
+
+def plan_draft_size(src_size, target_w, target_h, crop_mode="top", orientation=1,
+                    min_side=0, margin=DRAFT_MARGIN):
+    """Return the (w, h) to pass to Image.draft(), or None if no reduction helps.
+
+    src_size is the stored (pre-EXIF-rotation) size; orientation is the EXIF
+    orientation tag. min_side keeps both sides at least that large (e.g. the
+    AI model's input resolution) when the source allows it.
+    """
+    src_w, src_h = src_size
+    rotated = orientation in (5, 6, 7, 8)
+    if rotated:
+        src_w, src_h = src_h, src_w
+    if crop_mode == "fill":
+        ratio = min(target_w / src_w, target_h / src_h)
+    else:
+        ratio = max(target_w / src_w, target_h / src_h)
+    need_w = max(math.ceil(src_w * ratio * margin), min(src_w, min_side))
+    need_h = max(math.ceil(src_h * ratio * margin), min(src_h, min_side))
+    if src_w // need_w < 2 or src_h // need_h < 2:
+        return None
+    return (need_h, need_w) if rotated else (need_w, need_h)
+
+
+def apply_draft(img, target_w, target_h, crop_mode="top", min_side=0):
+    """Configure a freshly opened JPEG to decode at a reduced DCT scale.
+
+    Returns True if draft mode was applied. Non-JPEG images are left alone.
+    """
+    if img.format != "JPEG":
+        return False
+    try:
+        orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+    except Exception:
+        orientation = 1
+    size = plan_draft_size(img.size, target_w, target_h, crop_mode, orientation, min_side)
+    if size is None:
+        return False
+    img.draft(img.mode, size)
+    return True
 
 
 def fix_orientation(img):
@@ -161,40 +493,97 @@ def fix_orientation(img):
         return img
 
 
+# Large downscales first shrink by a whole factor with Image.reduce(), keeping
+# at least this much headroom for the final LANCZOS pass (Pillow's
+# reducing_gap). Higher values are closer to a pure LANCZOS resample.
+REDUCING_GAP = 3.0
+
+
+def _resample_window(img, scaled_size, window):
+    """Return window (left, top, right, bottom) of img as if scaled to scaled_size.
+
+    Only the source pixels under the window are resampled — the rest of the
+    scaled image is never computed.
+    """
+    new_w, new_h = scaled_size
+    left, top, right, bottom = window
+    scale_x = img.width / new_w
+    scale_y = img.height / new_h
+    box = (left * scale_x, top * scale_y, right * scale_x, bottom * scale_y)
+    return img.resize((right - left, bottom - top), Image.LANCZOS,
+                      box=box, reducing_gap=REDUCING_GAP)
+
+
 def crop_center(img, target_w, target_h):
     ratio = max(target_w / img.width, target_h / img.height)
-    new_w = int(img.width * ratio)
-    new_h = int(img.height * ratio)
-    img = img.resize((new_w, new_h), Image.LANCZOS)
+    # Float error can leave the scaled side 1 px short of the target
+    new_w = max(target_w, int(img.width * ratio))
+    new_h = max(target_h, int(img.height * ratio))
     left = (new_w - target_w) // 2
     top = (new_h - target_h) // 2
-    return img.crop((left, top, left + target_w, top + target_h))
+    return _resample_window(img, (new_w, new_h), (left, top, left + target_w, top + target_h))
 
 
 def crop_top(img, target_w, target_h):
     ratio = max(target_w / img.width, target_h / img.height)
-    new_w = int(img.width * ratio)
-    new_h = int(img.height * ratio)
-    img = img.resize((new_w, new_h), Image.LANCZOS)
+    # Float error can leave the scaled side 1 px short of the target
+    new_w = max(target_w, int(img.width * ratio))
+    new_h = max(target_h, int(img.height * ratio))
     left = (new_w - target_w) // 2
-    return img.crop((left, 0, left + target_w, target_h))
+    return _resample_window(img, (new_w, new_h), (left, 0, left + target_w, target_h))
+
+
+def _visible_window(size, offset, canvas_size):
+    """Part of a size-d layer placed at offset that lands on the canvas.
+
+    Returns (left, top, right, bottom) in the layer's own coordinates, or None
+    if nothing shows.
+    """
+    new_w, new_h = size
+    offset_x, offset_y = offset
+    left = max(0, -offset_x)
+    right = min(new_w, canvas_size[0] - offset_x)
+    top = max(0, -offset_y)
+    bottom = min(new_h, canvas_size[1] - offset_y)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def _paste_resized(canvas, img, size, offset):
+    """Scale img to size and paste it at offset, resampling only what shows.
+
+    The part of the scaled image that lands on the canvas is worked out first,
+    so pixels that would be clipped are never computed. Very large visible
+    areas are resampled and pasted one horizontal band at a time, so the full
+    scaled copy is never held in memory. RGBA images use their own alpha.
+    """
+    window = _visible_window(size, offset, canvas.size)
+    if window is None:
+        return
+    offset_x, offset_y = offset
+    left, first, right, last = window
+    rows = last - first
+    if (right - left) * rows > LARGE_CANVAS_PIXELS:
+        rows = _band_rows(right - left)
+    for top in range(first, last, rows):
+        bottom = min(top + rows, last)
+        part = _resample_window(img, size, (left, top, right, bottom))
+        canvas.paste(part, (offset_x + left, offset_y + top),
+                     part if part.mode == 'RGBA' else None)
 
 
 def fill_resize(img, target_w, target_h, bg_spec=None):
     ratio = min(target_w / img.width, target_h / img.height)
     new_w = int(img.width * ratio)
     new_h = int(img.height * ratio)
-    resized = img.resize((new_w, new_h), Image.LANCZOS)
     if bg_spec and bg_spec['type'] != 'transparent':
-        canvas = create_background(bg_spec, target_w, target_h)
+        canvas = get_background(bg_spec, target_w, target_h)
     else:
         canvas = Image.new('RGBA', (target_w, target_h), (0, 0, 0, 0))
     offset_x = (target_w - new_w) // 2
     offset_y = (target_h - new_h) // 2
-    if resized.mode == 'RGBA':
-        canvas.paste(resized, (offset_x, offset_y), resized)
-    else:
-        canvas.paste(resized, (offset_x, offset_y))
+    _paste_resized(canvas, img, (new_w, new_h), (offset_x, offset_y))
     return canvas
 
 
@@ -207,23 +596,24 @@ def composite_on_background(fg, bg_spec, width, height, crop_mode="top"):
       'center' — center subject vertically
       'fill'   — shrink-to-fit with padding (no cropping)
     """
+    size, offset = _composite_layout(fg.size, width, height, crop_mode)
+    canvas = _composite_canvas(bg_spec, width, height)
+    _paste_resized(canvas, fg, size, offset)
+    return canvas
+
+
+def _composite_layout(src_size, width, height, crop_mode):
+    """Scaled size and paste offset of the subject for a crop mode."""
+    src_w, src_h = src_size
     if crop_mode == "fill":
         # Shrink to fit — no cropping, pad with background
-        ratio = min(width / fg.width, height / fg.height)
+        ratio = min(width / src_w, height / src_h)
     else:
-        # Zoom to fill — subject fills canvas, excess clipped by paste
-        ratio = max(width / fg.width, height / fg.height)
+        # Zoom to fill — subject fills canvas, only the visible part is resampled
+        ratio = max(width / src_w, height / src_h)
 
-    new_w = int(fg.width * ratio)
-    new_h = int(fg.height * ratio)
-    fg_resized = fg.resize((new_w, new_h), Image.LANCZOS)
-
-    if bg_spec['type'] == 'transparent':
-        canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    else:
-        canvas = create_background(bg_spec, width, height)
-        if canvas.mode != 'RGBA':
-            canvas = canvas.convert('RGBA')
+    new_w = int(src_w * ratio)
+    new_h = int(src_h * ratio)
 
     # Horizontal: always centered
     offset_x = (width - new_w) // 2
@@ -234,53 +624,506 @@ def composite_on_background(fg, bg_spec, width, height, crop_mode="top"):
     else:
         offset_y = (height - new_h) // 2  # Center vertically
 
-    canvas.paste(fg_resized, (offset_x, offset_y), fg_resized)
-    return canvas
+    return (new_w, new_h), (offset_x, offset_y)
 
 
-_rembg_sessions = {}
+def _composite_canvas(bg_spec, width, height):
+    if bg_spec['type'] == 'transparent':
+        return Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    return get_background(bg_spec, width, height, mode='RGBA')
+
 
 # ---------------------------------------------------------------------------
 # Background Removal Workflows
 # ---------------------------------------------------------------------------
 # Each workflow uses a different AI model with tuned post-processing.
-# Models are loaded lazily and cached for the session.
+# Models are loaded lazily and kept in a memory-budgeted pool (SessionPool).
 
 BG_WORKFLOWS = {
     "portrait": {
         "label": "Portrait (BiRefNet-Portrait)",
+        "icon": "🎯",
         "description": "Best for headshots and people. Exceptional hair and shoulder edge quality.",
         "model": "birefnet-portrait",
         "blur_radius": 0.8,
         "threshold_low": 15,
         "alpha_boost": 1.08,
+        "batch_size": 4,
     },
     "general": {
         "label": "General Purpose (BiRefNet-General)",
+        "icon": "🌐",
         "description": "Best all-around model. Great for products, objects, and mixed content.",
         "model": "birefnet-general",
         "blur_radius": 1.0,
         "threshold_low": 20,
         "alpha_boost": 1.05,
+        "batch_size": 4,
     },
     "bria": {
         "label": "High Detail (BRIA RMBG)",
+        "icon": "✨",
         "description": "State-of-the-art by BRIA AI. Excels at complex scenes and fine textures.",
         "model": "bria-rmbg",
         "blur_radius": 0.6,
         "threshold_low": 12,
         "alpha_boost": 1.10,
+        "batch_size": 4,
     },
 }
 
+# INT8 "fast" variants: same model, pre/post-processing and refinement, run on
+# the quantized copy that tools/quantize_models.py writes next to the model.
+for _key in list(BG_WORKFLOWS):
+    _wf = BG_WORKFLOWS[_key]
+    BG_WORKFLOWS[f"{_key}_fast"] = dict(
+        _wf,
+        label=_wf["label"].replace(" (", " Fast (", 1).replace(")", " INT8)"),
+        icon="⚡",
+        description="INT8-quantized — several times faster on CPU, slightly softer edges. "
+                    "Needs tools/quantize_models.py.",
+        quantized=True,
+    )
+del _key, _wf
+
+
+# onnxruntime settings for every model session. A BG_WORKFLOWS entry may add
+# its own "session_options" / "providers", and the JSON file at
+# session_config_path() overrides both — globally and per workflow:
+#   {"session_options": {"intra_op_num_threads": 4, "inter_op_num_threads": 1},
+#    "workflows": {"bria": {"session_options": {"enable_cpu_mem_arena": false}}}}
+# Session options are SessionOptions attribute names; graph_optimization_level
+# takes disable/basic/extended/all, execution_mode sequential/parallel, and
+# "config_entries" is passed to add_session_config_entry(). "providers" lists
+# execution providers by name; without it rembg picks the best available.
+SESSION_OPTIONS = {
+    "graph_optimization_level": "all",
+}
+# Applied over every other layer — set from command-line flags
+SESSION_OVERRIDES = {}
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+_EXECUTION_MODES = {"sequential": "ORT_SEQUENTIAL", "parallel": "ORT_PARALLEL"}
+
+
+def session_config_path():
+    return user_config_dir() / "onnxruntime.json"
+
+
+def load_session_config():
+    """The user's onnxruntime config as a dict, or {} if there is none."""
+    path = session_config_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise ValueError(f"Invalid onnxruntime config {path}: {e}") from None
+
+
+def save_session_config(config):
+    path = session_config_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def session_settings(workflow_key, config=None):
+    """(session options, providers or None) for a workflow, all layers merged."""
+    if config is None:
+        config = load_session_config()
+    wf = BG_WORKFLOWS[workflow_key]
+    wf_config = config.get("workflows", {}).get(workflow_key, {})
+    options = dict(SESSION_OPTIONS)
+    providers = None
+    for layer in (wf, config, wf_config):
+        options.update(layer.get("session_options", {}))
+        providers = layer.get("providers", providers)
+    options.update(SESSION_OVERRIDES)
+    return options, providers
+
+
+def _session_options(options):
+    """Build an onnxruntime.SessionOptions from a session_settings() dict."""
+    import onnxruntime as ort
+
+    sess_opts = ort.SessionOptions()
+    for name, value in options.items():
+        if name == "config_entries":
+            for key, entry in value.items():
+                sess_opts.add_session_config_entry(key, str(entry))
+            continue
+        if name == "graph_optimization_level":
+            value = getattr(ort.GraphOptimizationLevel, _GRAPH_OPTIMIZATION_LEVELS[value])
+        elif name == "execution_mode":
+            value = getattr(ort.ExecutionMode, _EXECUTION_MODES[value])
+        if not hasattr(sess_opts, name):
+            raise ValueError(f"Unknown onnxruntime session option: {name}")
+        setattr(sess_opts, name, value)
+    return sess_opts
+
+
+# Graph optimization of the large models dominates session start-up, so the
+# optimized graph is saved next to the model (in an "optimized" folder) and
+# loaded directly afterwards. Files are named by the model's SHA-256, the
+# onnxruntime version, optimization level and providers, so a new model or
+# runtime never picks up a stale graph. "optimized_model_cache": false in the
+# onnxruntime config turns this off.
+OPTIMIZED_MODEL_CACHE = True
+
+
+def _session_class(model_name):
+    from rembg.sessions import sessions_class
+
+    for session_class in sessions_class:
+        if session_class.name() == model_name:
+            return session_class
+    raise ValueError(f"No session class found for model '{model_name}'")
+
+
+def _default_providers():
+    """The execution providers rembg picks when none are configured."""
+    import onnxruntime as ort
+
+    available = ort.get_available_providers()
+    device = ort.get_device()
+    if device == "GPU" and "CUDAExecutionProvider" in available:
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    if device[:3] == "GPU" and "ROCMExecutionProvider" in available:
+        return ["ROCMExecutionProvider", "CPUExecutionProvider"]
+    if "OpenVINOExecutionProvider" in available:
+        return ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+    return ["CPUExecutionProvider"]
+
+
+def _model_digest(model_file, index_file):
+    """SHA-256 of a model file, remembered in index_file by path, mtime and size."""
+    stamp = "|".join(str(part) for part in _file_stamp(model_file))
+    try:
+        with open(index_file, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    if stamp not in index:
+        index[stamp] = file_digest(model_file)
+        tmp = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, index_file)
+    return index[stamp]
+
+
+def optimized_model_path(model_file, options, providers):
+    """Where the optimized graph for these settings is (or would be) cached."""
+    import onnxruntime as ort
+
+    cache_dir = Path(model_file).parent / "optimized"
+    cache_dir.mkdir(exist_ok=True)
+    digest = _model_digest(model_file, cache_dir / "digests.json")
+    level = options.get("graph_optimization_level", "all")
+    ep = "+".join(p.replace("ExecutionProvider", "").lower() for p in providers)
+    # Level "all" bakes in kernels for this CPU, so a model folder shared
+    # between machines keeps one entry per architecture
+    arch = platform.machine().lower() or "unknown"
+    return cache_dir / (f"{Path(model_file).stem}-{digest[:16]}-ort{ort.__version__}"
+                        f"-{level}-{ep}-{arch}.onnx")
+
+
+def quantized_model_path(model_file):
+    """Where tools/quantize_models.py writes the INT8 copy of a model."""
+    model_file = Path(model_file)
+    return model_file.with_name(f"{model_file.stem}.int8.onnx")
+
+
+def _new_session(model_name, options, providers=None, use_cache=None, quantized=False):
+    """Open a rembg session, loading a previously optimized graph when one is cached.
+
+    The session is built by rembg's own constructor, pointed at our model
+    file (optimized, INT8 or both) instead of the one it would download;
+    otherwise it behaves exactly like rembg.new_session(model_name).
+    """
+    import onnxruntime as ort
+
+    session_class = _session_class(model_name)
+    model_file = _model_file(model_name, quantized)
+    providers = list(providers) if providers else _default_providers()
+    sess_opts = _session_options(options)
+    if use_cache is None:
+        use_cache = load_session_config().get("optimized_model_cache", OPTIMIZED_MODEL_CACHE)
+
+    cached = tmp = None
+    if use_cache and options.get("graph_optimization_level", "all") != "disable":
+        try:
+            cached = optimized_model_path(model_file, options, providers)
+        except OSError:
+            pass  # Read-only model folder: optimize in memory as usual
+    if cached is not None and cached.exists():
+        model_file = cached
+        sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    elif cached is not None:
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+        sess_opts.optimized_model_filepath = str(tmp)
+
+    class Session(session_class):
+        @classmethod
+        def download_models(cls, *args, **kwargs):
+            return str(model_file)
+
+    Session.__name__ = Session.__qualname__ = session_class.__name__
+    session = Session(model_name, sess_opts, providers=providers)
+    if tmp is not None and tmp.exists():
+        try:
+            os.replace(tmp, cached)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    return session
+
+
+# Loaded sessions are capped at this many bytes, each costed at its model
+# file size × SESSION_MEMORY_FACTOR (weights plus onnxruntime's arenas).
+# "session_pool_mb" in the onnxruntime config overrides the budget.
+SESSION_POOL_BYTES = 2048 * 1_048_576
+SESSION_MEMORY_FACTOR = 2.0
+
+
+class SessionPool:
+    """Byte-bounded LRU pool of loaded model sessions, safe to share between threads.
+
+    Least recently used sessions are unloaded to make room for a new one,
+    except pinned ones — a run pins the models it cycles through so they are
+    not unloaded and reloaded batch after batch. The session being loaded is
+    always admitted, so a model larger than the whole budget still runs —
+    alone. Models are loaded outside the pool's lock; a second caller for
+    the same key waits for the first to finish loading it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> (session, cost)
+        self._bytes = 0              # includes the cost of sessions being loaded
+        self._loading = {}           # key -> Event set when its load ends
+        self._pins = {}              # key -> number of pin() calls holding it
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def get(self, key, load, cost):
+        """The session for key; on a miss, cost() bytes are freed and load() is called."""
+        while True:
+            with self._lock:
+                item = self._items.get(key)
+                if item is not None:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return item[0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()  # Then take the session it loaded, or load it if that failed
+        size = 0
+        try:
+            size = cost()
+            with self._lock:
+                for evict in [k for k in self._items if k not in self._pins]:
+                    if self._bytes + size <= self.max_bytes:
+                        break
+                    self._bytes -= self._items.pop(evict)[1]
+                    self.unloads += 1
+                self._bytes += size
+            session = load()
+        except BaseException:
+            with self._lock:
+                self._bytes -= size
+                del self._loading[key]
+            loading.set()
+            raise
+        with self._lock:
+            self._items[key] = (session, size)
+            self.loads += 1
+            del self._loading[key]
+        loading.set()
+        return session
+
+    def pin(self, keys):
+        """Keep the sessions for keys loaded (once loaded) until unpin(keys)."""
+        with self._lock:
+            for key in keys:
+                self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, keys):
+        with self._lock:
+            for key in keys:
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+
+    def release(self, predicate=None):
+        """Unload every session (or those whose key matches predicate); returns the count."""
+        with self._lock:
+            keys = [k for k in self._items if predicate is None or predicate(k)]
+            for key in keys:
+                self._bytes -= self._items.pop(key)[1]
+            self.unloads += len(keys)
+            return len(keys)
+
+    def __len__(self):
+        return len(self._items)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.loads = 0
+        self.unloads = 0
+
+    def summary(self):
+        return (f"{self.loads} loaded, {self.hits} reused, {self.unloads} unloaded "
+                f"({len(self._items)} resident, ~{self._bytes / 1_048_576:.0f} MB)")
+
+
+_session_pool = SessionPool(SESSION_POOL_BYTES)
+
+
+def _model_file(model_name, quantized=False):
+    """Path of a rembg model's .onnx file, downloading it first if needed.
+
+    quantized selects the INT8 copy, which must already have been made.
+    """
+    model_file = Path(_session_class(model_name).download_models())
+    if not quantized:
+        return model_file
+    int8_file = quantized_model_path(model_file)
+    if not int8_file.exists():
+        raise FileNotFoundError(
+            f"No INT8 model for {model_name} — run: python tools/quantize_models.py {model_name}")
+    return int8_file
+
+
+def _local_model_file(model_name):
+    """Path of a rembg model's .onnx file if it is already downloaded, else None."""
+    try:
+        session_class = _session_class(model_name)
+    except ImportError:
+        return None
+    fname = f"{session_class.name()}.onnx"
+    if hasattr(session_class, "resolve_existing"):
+        found = session_class.resolve_existing(fname)
+    else:
+        found = os.path.join(session_class.u2net_home(), fname)  # rembg before models/<name>/
+    return Path(found) if found and os.path.exists(found) else None
 
-def _get_session(model_name):
-    """Lazily load and cache a rembg model session."""
-    global _rembg_sessions
-    if model_name not in _rembg_sessions:
-        from rembg import new_session
-        _rembg_sessions[model_name] = new_session(model_name)
-    return _rembg_sessions[model_name]
+
+def available_workflows():
+    """BG_WORKFLOWS keys that can run here: fast ones only once their INT8 model exists."""
+    available = []
+    for wf_key, wf in BG_WORKFLOWS.items():
+        if wf.get("quantized"):
+            model_file = _local_model_file(wf["model"])
+            if model_file is None or not quantized_model_path(model_file).exists():
+                continue
+        available.append(wf_key)
+    return available
+
+
+def _session_spec(workflow_key):
+    """(pool key, model name, quantized, options, providers) for a workflow's session."""
+    wf = BG_WORKFLOWS[workflow_key]
+    model_name = wf["model"]
+    quantized = wf.get("quantized", False)
+    config = load_session_config()
+    if "session_pool_mb" in config:
+        _session_pool.max_bytes = int(config["session_pool_mb"] * 1_048_576)
+    options, providers = session_settings(workflow_key, config)
+    key = (model_name, json.dumps([quantized, options, providers], sort_keys=True))
+    return key, model_name, quantized, options, providers
+
+
+def _get_session(workflow_key):
+    """The pooled rembg session for a workflow's model and settings, loading it if needed."""
+    key, model_name, quantized, options, providers = _session_spec(workflow_key)
+    return _session_pool.get(
+        key,
+        load=lambda: _new_session(model_name, options, providers, quantized=quantized),
+        cost=lambda: int(_model_file(model_name, quantized).stat().st_size
+                         * SESSION_MEMORY_FACTOR),
+    )
+
+
+def release_sessions(model_name=None):
+    """Unload pooled sessions — all, or every one of model_name. Returns the count."""
+    return _session_pool.release(None if model_name is None else lambda k: k[0] == model_name)
+
+
+def _dummy_feed(session, batch=1):
+    """Random model input of the session's shape; dynamic dimensions become batch × 1024²."""
+    spec = session.inner_session.get_inputs()[0]
+    shape = [d if isinstance(d, int) else (batch if i == 0 else MASK_INFERENCE_SIDE)
+             for i, d in enumerate(spec.shape)]
+    return {spec.name: np.random.default_rng(0).standard_normal(shape, dtype=np.float32)}
+
+
+# Sessions that have run at least once (onnxruntime finishes setting up on the first run)
+_warm_sessions = weakref.WeakSet()
+
+
+def warm_up(workflow_key):
+    """Load a workflow's session and run one dummy inference through it.
+
+    The first real image then starts on a ready model. Cheap when the session
+    is already warm, so it is safe to call whenever the selection changes.
+    """
+    session = _get_session(workflow_key)
+    if session not in _warm_sessions:
+        session.inner_session.run(
+            None, _dummy_feed(session, BG_WORKFLOWS[workflow_key].get("batch_size", 1)))
+        _warm_sessions.add(session)
+    return session
+
+
+def _thread_candidates(max_threads):
+    counts = {1, max_threads}
+    n = 2
+    while n < max_threads:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def autotune_threads(workflow_key, max_threads=None, seconds=5.0, log=print):
+    """Find the intra-op thread count with the best throughput on this machine.
+
+    Times the workflow's model on a dummy batch of batch_size inputs for each
+    candidate count up to max_threads (default: all CPUs), with one inter-op
+    thread, and returns [(threads, images/sec)] best first. Each candidate
+    gets about seconds of runs after a warm-up.
+    """
+    max_threads = max_threads or os.cpu_count() or 1
+    wf = BG_WORKFLOWS[workflow_key]
+    options, providers = session_settings(workflow_key)
+    batch = wf.get("batch_size", 1)
+    results = []
+    for threads in _thread_candidates(max_threads):
+        session = _new_session(wf["model"], {**options, "intra_op_num_threads": threads,
+                                             "inter_op_num_threads": 1}, providers,
+                               quantized=wf.get("quantized", False))
+        feed = _dummy_feed(session, batch)
+        session.inner_session.run(None, feed)  # Warm-up: arena allocation, kernel selection
+        runs = 0
+        start = time.perf_counter()
+        while runs == 0 or time.perf_counter() - start < seconds:
+            session.inner_session.run(None, feed)
+            runs += 1
+        rate = runs * len(next(iter(feed.values()))) / (time.perf_counter() - start)
+        log(f"  {threads:>3} threads: {rate:.2f} images/sec")
+        results.append((threads, rate))
+        del session
+    return sorted(results, key=lambda r: -r[1])
 
 
 def _refine_alpha(img, blur_radius=1.0, threshold_low=20, alpha_boost=1.05):
@@ -291,43 +1134,1866 @@ def _refine_alpha(img, blur_radius=1.0, threshold_low=20, alpha_boost=1.05):
       threshold_low — Pixels below this become fully transparent (removes halo)
       alpha_boost   — Multiply remaining alpha to strengthen edges (1.0 = no change)
     """
-    from PIL import ImageFilter
-
     if img.mode != "RGBA":
         return img
 
     r, g, b, a = img.split()
-    a_smooth = a.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-    a_clean = a_smooth.point(
+    a_clean = _refine_mask(a, blur_radius, threshold_low, alpha_boost)
+    return Image.merge("RGBA", (r, g, b, a_clean))
+
+
+def _refine_mask(mask, blur_radius=1.0, threshold_low=20, alpha_boost=1.05):
+    """The _refine_alpha edge cleanup applied to a bare 8-bit mask."""
+    from PIL import ImageFilter
+
+    if blur_radius > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+    return mask.point(
         lambda x: 0 if x < threshold_low else min(255, int(x * alpha_boost))
     )
-    return Image.merge("RGBA", (r, g, b, a_clean))
 
 
-def remove_background(img, workflow_key="portrait"):
-    """Remove background using the specified workflow."""
+# Masks are predicted on a copy of the image whose short side is this long —
+# the models' own input resolution — instead of on the full decode.
+MASK_INFERENCE_SIDE = 1024
+
+# Pre/post-processing of the rembg session classes, per model, so several
+# images can go through one batched inference run:
+# (normalize mean, normalize std, input size, sigmoid on the output).
+# Models not listed here are always run one image at a time.
+_BATCHED_MODELS = {
+    "birefnet-portrait": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (1024, 1024), True),
+    "birefnet-general": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (1024, 1024), True),
+    "bria-rmbg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (1024, 1024), False),
+}
+
+
+# Speed tiers: the square input resolution each model runs at. "max" is the
+# models' native 1024 px; lower tiers trade edge detail for speed and suit
+# small outputs. A BG_WORKFLOWS entry may override these with its own "tiers".
+# Models with a fixed input shape always run at their native size.
+SPEED_TIERS = {"draft": 512, "standard": 768, "max": 1024}
+# Auto tier: the first tier whose limit the largest output side fits under
+AUTO_TIER_LIMITS = (("draft", 400), ("standard", 1000))
+
+# Images and seconds spent in inference per (tier, input side), for the run log
+inference_stats = {}
+
+
+def auto_tier(width, height):
+    """The speed tier for an output size, by its longer side."""
+    for tier, limit in AUTO_TIER_LIMITS:
+        if max(width, height) <= limit:
+            return tier
+    return "max"
+
+
+def tier_side(workflow_key, tier):
+    return BG_WORKFLOWS[workflow_key].get("tiers", SPEED_TIERS)[tier]
+
+
+def _input_size(session, side, native):
+    """(w, h) the model will run at: side × side, unless its input shape is fixed."""
+    height, width = session.inner_session.get_inputs()[0].shape[2:]
+    if isinstance(height, int) or isinstance(width, int):
+        return native
+    return (side, side)
+
+
+def _read_varint(f):
+    value = shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise EOFError
+        value |= (byte[0] & 0x7F) << shift
+        shift += 7
+        if byte[0] < 0x80:
+            return value
+
+
+def _proto_fields(f, end):
+    """(field number, wire type, value or (start, length)) for each field up to offset end.
+
+    Length-delimited fields are not read, only located, so the weights of a
+    model are skipped over with a seek.
+    """
+    while f.tell() < end:
+        tag = _read_varint(f)
+        wire = tag & 7
+        if wire == 0:
+            yield tag >> 3, wire, _read_varint(f)
+        elif wire == 2:
+            length = _read_varint(f)
+            start = f.tell()
+            yield tag >> 3, wire, (start, length)
+            f.seek(start + length)
+        else:
+            f.seek({1: 8, 5: 4}[wire], os.SEEK_CUR)
+
+
+_input_dims_cache = {}
+
+
+def onnx_input_dims(model_file):
+    """Dimensions of an ONNX model's first input without loading the model.
+
+    Fixed dimensions are ints and dynamic ones None; returns None if the file
+    can't be read.
+    """
+    model_file = str(model_file)
+    if model_file in _input_dims_cache:
+        return _input_dims_cache[model_file]
+
+    def find(f, end, number):
+        for field, wire, value in _proto_fields(f, end):
+            if field == number and wire == 2:
+                f.seek(value[0])
+                return value[0] + value[1]
+        raise EOFError(number)
+
+    dims = None
+    try:
+        with open(model_file, "rb") as f:
+            end = find(f, os.fstat(f.fileno()).st_size, 7)  # ModelProto.graph
+            end = find(f, end, 11)                           # GraphProto.input
+            end = find(f, end, 2)                            # ValueInfoProto.type
+            end = find(f, end, 1)                            # TypeProto.tensor_type
+            end = find(f, end, 2)                            # Tensor.shape
+            dims = []
+            for field, wire, value in _proto_fields(f, end):  # TensorShapeProto.dim
+                if field == 1 and wire == 2:
+                    here = f.tell()
+                    f.seek(value[0])
+                    fixed = [v for n, w, v in _proto_fields(f, sum(value)) if n == 1 and w == 0]
+                    dims.append(fixed[0] if fixed else None)
+                    f.seek(here)
+    except (OSError, EOFError, KeyError):
+        dims = None
+    _input_dims_cache[model_file] = dims
+    return dims
+
+
+def inference_side(workflow_key, tier):
+    """Input side the workflow's model runs at for a tier — as _input_size() will pick it."""
+    wf = BG_WORKFLOWS[workflow_key]
+    spec = _BATCHED_MODELS.get(wf["model"])
+    if spec is None:
+        return MASK_INFERENCE_SIDE  # Run through rembg at inference geometry
+    # Never download here: cache keys are computed before any model is loaded.
+    # A model not fetched yet is taken to follow the tier, as dynamic ones do.
+    model_file = _local_model_file(wf["model"])
+    if model_file is not None and wf.get("quantized"):
+        model_file = quantized_model_path(model_file)
+    dims = onnx_input_dims(model_file) if model_file is not None else None
+    if dims and len(dims) == 4 and (dims[2] is not None or dims[3] is not None):
+        return max(spec[2])
+    return tier_side(workflow_key, tier)
+
+
+def _inference_view(img, side=MASK_INFERENCE_SIDE):
+    """img reduced to side on its short side (never enlarged)."""
+    scale = side / min(img.size)
+    if scale >= 1:
+        return img
+    return img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                      Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+def _accepts_batches(session):
+    """True if the model's batch dimension is dynamic."""
+    dim = session.inner_session.get_inputs()[0].shape[0]
+    return not isinstance(dim, int)
+
+
+def predict_masks(images, workflow_key="portrait", tier="max"):
+    """predict_mask() for several images at a speed tier, batch_size of them per model run.
+
+    The workflow's batch_size images are stacked into one input tensor —
+    onnxruntime keeps its thread pool much busier on one large run than on
+    several small ones — and run at the tier's input resolution. Masks come
+    back with their short side at that resolution. Models with a fixed batch
+    dimension run one image at a time; models unknown to _BATCHED_MODELS go
+    through rembg at their native size.
+    """
+    from rembg.bg import post_process
+
+    wf = BG_WORKFLOWS[workflow_key]
+    spec = _BATCHED_MODELS.get(wf["model"])
+    if spec is None:
+        return [predict_mask(img, workflow_key) for img in images]
+    session = _get_session(workflow_key)
+    mean, std, native_size, sigmoid = spec
+    input_size = _input_size(session, tier_side(workflow_key, tier), native_size)
+    batch_size = wf.get("batch_size", 1) if _accepts_batches(session) else 1
+
+    start_time = time.perf_counter()
+    input_name = session.inner_session.get_inputs()[0].name
+    masks = []
+    for start in range(0, len(images), batch_size):
+        views = [_inference_view(img, max(input_size))
+                 for img in images[start:start + batch_size]]
+        batch = np.concatenate([session.normalize(view, mean, std, input_size)[input_name]
+                                for view in views])
+        preds = session.inner_session.run(None, {input_name: batch})[0][:, 0, :, :]
+        for view, pred in zip(views, preds):
+            # Per image, exactly as the session's own predict() does it
+            if sigmoid:
+                pred = 1 / (1 + np.exp(-pred))
+            pred = (pred - pred.min()) / (pred.max() - pred.min())
+            mask = Image.fromarray((pred * 255).astype("uint8"), mode="L")
+            mask = mask.resize(view.size, Image.LANCZOS)
+            masks.append(Image.fromarray(post_process(np.array(mask))))
+    stats = inference_stats.setdefault((tier, max(input_size)), [0, 0.0])
+    stats[0] += len(images)
+    stats[1] += time.perf_counter() - start_time
+    return masks
+
+
+def predict_mask(img, workflow_key="portrait", full_resolution=False):
+    """Run the workflow's model on img and return its post-processed 8-bit mask.
+
+    By default the mask comes back at inference geometry (short side
+    MASK_INFERENCE_SIDE, same aspect as img); full_resolution returns it at
+    img's own size, as rembg.remove() does.
+    """
     from rembg import remove
 
+    session = _get_session(workflow_key)
+    if not full_resolution:
+        img = _inference_view(img)
+    return remove(img, session=session, only_mask=True, post_process_mask=True)
+
+
+def remove_background(img, workflow_key="portrait", mask=None):
+    """Remove background using the specified workflow.
+
+    Pass a previously predicted mask (e.g. from the mask cache) to skip
+    inference; it is resized to img if it was made at another resolution.
+    """
+    from rembg.bg import naive_cutout
+
     wf = BG_WORKFLOWS[workflow_key]
-    session = _get_session(wf["model"])
+    if mask is None:
+        mask = predict_mask(img, workflow_key, full_resolution=True)
+    elif mask.size != img.size:
+        mask = mask.resize(img.size, Image.LANCZOS)
 
-    result = remove(
-        img,
-        session=session,
-        post_process_mask=True,
-    )
     return _refine_alpha(
-        result,
+        naive_cutout(img, mask),
         blur_radius=wf["blur_radius"],
         threshold_low=wf["threshold_low"],
         alpha_boost=wf["alpha_boost"],
     )
 
 
+# ---------------------------------------------------------------------------
+# Mask cache
+# ---------------------------------------------------------------------------
+# Model masks are stored on disk as 8-bit PNGs, addressed by the source file's
+# content hash plus everything that shapes the mask, so re-runs that only
+# change the background, size, crop mode or format skip inference entirely.
+
+MASK_CACHE_BYTES = 2 * 1024 ** 3
+_MASK_CACHE_VERSION = 1
+
+
+def user_cache_dir():
+    """Per-user cache directory for this app, following each platform's convention."""
+    if sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    elif sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "dhg-graphics-resizer"
+
+
+def user_config_dir():
+    """Per-user settings directory for this app, following each platform's convention."""
+    if sys.platform == "darwin":
+        base = Path.home() / "Library" / "Application Support"
+    elif sys.platform == "win32":
+        base = Path(os.environ.get("APPDATA", Path.home() / "AppData" / "Roaming"))
+    else:
+        base = Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config"))
+    return base / "dhg-graphics-resizer"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, as hex."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MaskCache:
+    """Content-addressed on-disk cache of 8-bit masks with size-based eviction.
+
+    Entries are evicted least-recently-used first (hits refresh the file's
+    mtime) once the cache grows past max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=MASK_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._bytes = None  # Scanned lazily on first store
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content_hash, workflow_key, tier="max"):
+        """Cache key for a source file's mask under a workflow's current settings."""
+        wf = BG_WORKFLOWS[workflow_key]
+        params = {
+            "version": _MASK_CACHE_VERSION,
+            "source": content_hash,
+            "workflow": workflow_key,
+            "model": wf["model"],
+            "blur_radius": wf["blur_radius"],
+            "threshold_low": wf["threshold_low"],
+            "alpha_boost": wf["alpha_boost"],
+        }
+        side = inference_side(workflow_key, tier)
+        if side != inference_side(workflow_key, "max"):
+            # Max tier keys stay as they were before tiers existed, and tiers
+            # a fixed-shape model ignores share its one mask
+            params["input_side"] = side
+        blob = json.dumps(params, sort_keys=True).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.png"
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with Image.open(path) as cached:
+                mask = cached.convert("L")
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return mask
+
+    def store(self, key, mask):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        mask.convert("L").save(tmp, format="PNG", compress_level=1)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self.size()[1]
+            else:
+                self._bytes += path.stat().st_size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        if not self.root.is_dir():
+            return []
+        entries = []
+        for path in self.root.glob("*/*.png"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction doesn't run on every store
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+    def size(self):
+        """Return (entry count, total bytes)."""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def purge(self):
+        """Delete every cached mask. Returns (files removed, bytes freed)."""
+        with self._lock:
+            count, total = self.size()
+            if self.root.is_dir():
+                shutil.rmtree(self.root, ignore_errors=True)
+            self._bytes = 0
+        return count, total
+
+
+_mask_cache = MaskCache(user_cache_dir() / "masks")
+
+
+def get_mask(img, workflow_key, content_hash=None, tier="max"):
+    """The workflow's mask for img at a speed tier, from the on-disk cache if possible.
+
+    content_hash (see file_digest) enables the cache; None always infers.
+    """
+    return get_masks([img], workflow_key, [content_hash], tier)[0]
+
+
+def get_masks(images, workflow_key, content_hashes, tier="max"):
+    """get_mask() for several images; cache misses are predicted in batches."""
+    masks = [None] * len(images)
+    keys = [None] * len(images)
+    for i, content_hash in enumerate(content_hashes):
+        if content_hash is not None:
+            keys[i] = MaskCache.key(content_hash, workflow_key, tier)
+            masks[i] = _mask_cache.load(keys[i])
+    todo = [i for i, mask in enumerate(masks) if mask is None]
+    if todo:
+        predicted = predict_masks([images[i] for i in todo], workflow_key, tier)
+        for i, mask in zip(todo, predicted):
+            masks[i] = mask
+            if keys[i] is None:
+                continue
+            try:
+                _mask_cache.store(keys[i], mask)
+            except OSError:
+                pass  # A read-only or full cache disk must not fail the image
+    return masks
+
+
+def composite_masked(img, mask, workflow_key, bg_spec, width, height, crop_mode="top"):
+    """Cut img out with a model mask and composite it, working at output resolution.
+
+    Equivalent to composite_on_background(remove_background(img, ...), ...)
+    but the mask — at any resolution with img's aspect — is scaled straight
+    to the visible output window, and the workflow's edge refinement runs
+    there with its blur radius scaled to match. The radius is scaled from the
+    source's full width (prepare_image records it), not from a draft-decoded
+    img. No full-resolution cutout or mask copy is ever made.
+    """
+    wf = BG_WORKFLOWS[workflow_key]
+    size, offset = _composite_layout(img.size, width, height, crop_mode)
+    canvas = _composite_canvas(bg_spec, width, height)
+    window = _visible_window(size, offset, canvas.size)
+    if window is None:
+        return canvas
+
+    raw = _resample_window(mask, size, window)
+    if img.mode == "RGBA":
+        # As rembg's cutout of an RGBA input: the mask scales the input's alpha
+        from PIL import ImageChops
+
+        raw = ImageChops.multiply(raw, _resample_window(img.getchannel("A"), size, window))
+    alpha = _refine_mask(
+        raw,
+        blur_radius=wf["blur_radius"] * size[0] / img.info.get("source_width", img.width),
+        threshold_low=wf["threshold_low"],
+        alpha_boost=wf["alpha_boost"],
+    )
+
+    left, first, right, last = window
+    rows = last - first
+    if (right - left) * rows > LARGE_CANVAS_PIXELS:
+        rows = _band_rows(right - left)
+    offset_x, offset_y = offset
+    for top in range(first, last, rows):
+        bottom = min(top + rows, last)
+        band = _resample_window(img, size, (left, top, right, bottom)).convert("RGB")
+        band_box = (0, top - first, right - left, bottom - first)
+        # Same premultiplied look as rembg's naive cutout, then the refined alpha
+        black = Image.new("RGB", band.size)
+        fg = Image.composite(band, black, raw.crop(band_box))
+        fg.putalpha(alpha.crop(band_box))
+        canvas.paste(fg, (offset_x + left, offset_y + top), fg)
+    return canvas
+
+
+# ---------------------------------------------------------------------------
+# Batch pipeline
+# ---------------------------------------------------------------------------
+
+OUTPUT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def size_folder_name(label):
+    """Filesystem-safe subfolder name for a size preset label.
+
+    "400 × 400 — LinkedIn Profile" → "400x400_LinkedIn_Profile"
+    """
+    name = label.replace(" × ", "x")
+    name = re.sub(r"[^A-Za-z0-9x]+", "_", name)
+    return name.strip("_")
+
+
+def encode_image(img, fp, fmt, quality):
+    """Write img to a path or file object in fmt with the format's save options."""
+    if fmt == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    save_params = {}
+    if fmt == "JPEG":
+        save_params = {"quality": quality, "optimize": True}
+    elif fmt == "WEBP":
+        save_params = {"quality": quality}
+    elif fmt == "PNG":
+        save_params = {"optimize": True}
+    img.save(fp, format=fmt, **save_params)
+
+
+def _partial_path(path):
+    """Hidden name an output is written under before it is renamed into place."""
+    return path.with_name(f".{path.name}.part")
+
+
+def _write_atomically(path, write):
+    """Call write(temporary path), then rename the result over path.
+
+    A crash or error part-way leaves the previous file (or none) at path,
+    never a truncated one.
+    """
+    tmp = _partial_path(path)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def save_image(img, output_path, stem, fmt, quality):
+    """Encode img as output_path/<stem>.<ext> with the format's save options.
+
+    stem may contain / to place the file in a subfolder, which is created.
+    """
+    out_file = Path(output_path) / (stem + OUTPUT_EXTENSIONS[fmt])
+    if "/" in stem:
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomically(out_file, lambda tmp: encode_image(img, tmp, fmt, quality))
+    return out_file
+
+
+def prepare_image(img_file, width, height, crop_mode, use_draft=True, for_ai=False):
+    """Decode and orient one input for rendering. Returns (image, "W×H" source size)."""
+    img = Image.open(img_file)
+    source = img.size
+    orig_size = f"{img.width}×{img.height}"
+    if use_draft:
+        # Keep enough pixels for the AI model's 1024 px input
+        apply_draft(img, width, height, crop_mode, min_side=1024 if for_ai else 0)
+    decoded = img.size
+    img = fix_orientation(img)
+    if for_ai and _has_alpha(img):
+        img = img.convert("RGBA")  # The cutout keeps the input's own transparency
+    else:
+        img = img.convert("RGB")
+    # Upright source width, which composite_masked scales the edge blur from
+    turned = img.size != decoded
+    img.info["source_width"] = source[1] if turned else source[0]
+    return img, orig_size
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA", "RGBa", "La") or "transparency" in img.info
+
+
+def render_image(img, width, height, crop_mode, bg_spec, wf_key=None, mask=None):
+    """Produce the output canvas from a prepared image.
+
+    With wf_key and its model mask the background is replaced; without them
+    the image is simply resized.
+    """
+    if wf_key:
+        return composite_masked(img, mask, wf_key, bg_spec, width, height, crop_mode)
+    if crop_mode == "center":
+        return crop_center(img, width, height)
+    if crop_mode == "top":
+        return crop_top(img, width, height)
+    if crop_mode == "fill":
+        return fill_resize(img, width, height, bg_spec=bg_spec)
+    return img
+
+
+def output_stem(img_file, input_root=None):
+    """Output name of img_file, without extension.
+
+    Under input_root it is the path relative to it ("event/day/name"), so
+    outputs mirror the input's subfolders; otherwise just the file's stem.
+    """
+    img_file = Path(img_file)
+    if input_root is None:
+        return img_file.stem
+    return img_file.relative_to(input_root).with_suffix("").as_posix()
+
+
+def process_file(img_file, targets, crop_mode, fmt, quality, bg_spec,
+                 use_draft=True, use_mask_cache=True, tier="max", input_root=None, on_target=None):
+    """Decode img_file once and render it for every target.
+
+    Each target is (wf_key, (width, height), [output folders]). wf_key selects
+    an AI background workflow (None is resize-only); its mask is predicted
+    once per workflow and reused for every size, and with use_mask_cache the
+    mask comes from the on-disk cache when this file was masked before. tier
+    is the speed tier masks are predicted at. Each size is encoded once and
+    copied into any further folders, named by output_stem(img_file, input_root).
+
+    Returns (source size "W×H", [error or None per target]). A decode failure
+    raises instead, since no target can be produced. on_target(k) is called
+    before target k is rendered. Module-level so resize-only batches can run
+    it in worker processes.
+    """
+    img, orig_size = _decode_for_targets(img_file, targets, crop_mode, use_draft)
+    content_hash = file_digest(img_file) if use_mask_cache and _uses_ai(targets) else None
+    masks = {}
+
+    def mask_for(wf_key):
+        if wf_key not in masks:
+            masks[wf_key] = get_mask(img, wf_key, content_hash, tier)
+        return masks[wf_key]
+
+    errors = _render_targets(img, output_stem(img_file, input_root), targets, crop_mode, fmt,
+                             quality, bg_spec, mask_for, on_target)
+    return orig_size, errors
+
+
+def process_batch(img_files, targets, crop_mode, fmt, quality, bg_spec,
+                  use_draft=True, use_mask_cache=True, tier="max", input_root=None, on_target=None):
+    """process_file() for several files, with their masks predicted together.
+
+    All files are decoded first so each workflow's cache misses go through
+    predict_masks() as one batch. Yields (index, result, error) per file in
+    order, result and error as process_file() would return or raise them.
+    on_target(index, k) is called before target k of file index is rendered.
+    """
+    decoded = []
+    for img_file in img_files:
+        try:
+            decoded.append(_decode_for_targets(img_file, targets, crop_mode, use_draft))
+        except Exception as e:
+            decoded.append(e)
+    ok = [i for i, d in enumerate(decoded) if not isinstance(d, Exception)]
+    use_mask_cache = use_mask_cache and _uses_ai(targets)
+    hashes = [file_digest(img_files[i]) if use_mask_cache else None for i in ok]
+
+    masks = {}  # wf_key -> {file index: mask or the exception that prevented it}
+    for wf_key in dict.fromkeys(wf_key for wf_key, _, _ in targets if wf_key):
+        try:
+            predicted = get_masks([decoded[i][0] for i in ok], wf_key, hashes, tier)
+        except Exception as e:
+            predicted = [e] * len(ok)
+        masks[wf_key] = dict(zip(ok, predicted))
+
+    for i, (img_file, d) in enumerate(zip(img_files, decoded)):
+        if isinstance(d, Exception):
+            yield i, None, d
+            continue
+
+        def mask_for(wf_key, i=i):
+            mask = masks[wf_key][i]
+            if isinstance(mask, Exception):
+                raise mask
+            return mask
+
+        img, orig_size = d
+        errors = _render_targets(img, output_stem(img_file, input_root), targets, crop_mode, fmt,
+                                 quality, bg_spec, mask_for,
+                                 on_target and (lambda k, i=i: on_target(i, k)))
+        yield i, (orig_size, errors), None
+
+
+def _uses_ai(targets):
+    return any(wf_key for wf_key, _, _ in targets)
+
+
+def _decode_for_targets(img_file, targets, crop_mode, use_draft):
+    # Decode for the most demanding size; every other size is a downscale of it
+    max_w = max(size[0] for _, size, _ in targets)
+    max_h = max(size[1] for _, size, _ in targets)
+    return prepare_image(img_file, max_w, max_h, crop_mode, use_draft, _uses_ai(targets))
+
+
+def _render_targets(img, stem, targets, crop_mode, fmt, quality, bg_spec, mask_for, on_target):
+    """Render and save img for every target; returns [error or None per target]."""
+    errors = []
+    for k, (wf_key, (width, height), folders) in enumerate(targets):
+        if on_target:
+            on_target(k)
+        try:
+            mask = mask_for(wf_key) if wf_key else None
+            out = render_image(img, width, height, crop_mode, bg_spec, wf_key, mask)
+            first = save_image(out, folders[0], stem, fmt, quality)
+            for folder in folders[1:]:
+                copy = Path(folder) / first.relative_to(folders[0])
+                copy.parent.mkdir(parents=True, exist_ok=True)
+                _write_atomically(copy, lambda tmp: shutil.copyfile(first, tmp))
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+    return errors
+
+
+def _outcome(index, future):
+    try:
+        result, error, stats = future.result()
+    except Exception as e:
+        return index, None, e  # The worker itself failed
+    for cache, delta in zip((_background_cache, _backdrop_cache), stats):
+        cache.add_stats(*delta)
+    return index, result, error
+
+
+def _counted(fn, args):
+    """fn(*args) in a worker process: (result, error, the cache statistics it added).
+
+    Each worker has its own caches, so their hits and misses are sent back to
+    be added to the parent's.
+    """
+    caches = (_background_cache, _backdrop_cache)
+    before = [cache.stats() for cache in caches]
+    result = error = None
+    try:
+        result = fn(*args)
+    except Exception as e:
+        error = e
+    stats = [tuple(now - then for now, then in zip(cache.stats(), start))
+             for cache, start in zip(caches, before)]
+    return result, error, stats
+
+
+def run_parallel(fn, jobs, workers):
+    """Run fn(*args) for every args tuple in jobs on a pool of worker processes.
+
+    Yields (index, result, error) in input order as results become available.
+    At most 2 × workers jobs are in flight, and an exception in one job is
+    returned as its error without affecting the others.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    pending = deque()
+    # Never fork this process: once onnxruntime has started its thread pools
+    # (any AI run or warm-up), a forked pool can leave the process hanging at exit
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for index, args in enumerate(jobs):
+            pending.append((index, pool.submit(_counted, fn, args)))
+            if len(pending) >= workers * 2:
+                yield _outcome(*pending.popleft())
+        while pending:
+            yield _outcome(*pending.popleft())
+
+
+def run_batched(jobs, on_target=None, status=None):
+    """Run process_file jobs in this process, yielding (index, result, error).
+
+    AI runs take the images a batch at a time (the largest batch_size of the
+    targets' workflows) so their masks are predicted together.
+    on_target(index, k) is called before each render; status(message) as each
+    batch starts. jobs may be any iterable — a batch starts as soon as its
+    jobs are available, and they must all share the first job's targets.
+    """
+    of = f"/{len(jobs)}" if hasattr(jobs, "__len__") else ""
+    jobs = iter(jobs)
+    chunk = list(itertools.islice(jobs, 1))
+    if not chunk:
+        return
+    batch = max((BG_WORKFLOWS[wf_key].get("batch_size", 1)
+                 for wf_key, _, _ in chunk[0][1] if wf_key), default=1)
+    start = 0
+    while chunk:
+        chunk += itertools.islice(jobs, batch - len(chunk))
+        if batch > 1 and status:
+            status(f"Removing backgrounds {start + 1}–{start + len(chunk)}{of}…")
+        for j, result, error in process_batch(
+                [args[0] for args in chunk], *chunk[0][1:],
+                on_target=on_target and (lambda j, k, start=start: on_target(start + j, k))):
+            yield start + j, result, error
+        start += len(chunk)
+        chunk = list(itertools.islice(jobs, 1))
+
+
+MANIFEST_NAME = ".resizer-manifest.json"
+_MANIFEST_VERSION = 1
+
+
+class RunManifest:
+    """Record of what earlier runs wrote into an output folder.
+
+    Stored as .resizer-manifest.json in the output folder: for each input
+    file its size, mtime and SHA-256, and the targets it was rendered for,
+    each identified by a key over the settings that shape the output. An
+    input is up to date when its size and mtime still match — or, if only
+    the mtime moved, its content hash does — every target's key is recorded
+    and every output file still exists, so an unchanged folder is checked
+    with stat() calls alone.
+    """
+
+    def __init__(self, output_base):
+        self.path = Path(output_base) / MANIFEST_NAME
+        self.targets = {}  # settings key -> settings
+        self.inputs = {}   # input path -> {"size", "mtime_ns", "sha256", "targets": [keys]}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == _MANIFEST_VERSION:
+            self.targets = data.get("targets", {})
+            self.inputs = data.get("inputs", {})
+
+    def target_key(self, settings):
+        """Key for a target's settings dict, remembered for the next save()."""
+        key = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+        self.targets[key] = settings
+        return key
+
+    def up_to_date(self, img_file, keys, outputs):
+        entry = self.inputs.get(str(img_file))
+        if entry is None or not set(keys) <= set(entry["targets"]):
+            return False
+        try:
+            st = os.stat(img_file)
+            if st.st_size != entry["size"]:
+                return False
+            if st.st_mtime_ns != entry["mtime_ns"]:
+                if file_digest(img_file) != entry["sha256"]:
+                    return False
+                entry["mtime_ns"] = st.st_mtime_ns  # Touched or copied, same content
+        except OSError:
+            return False
+        return all(out.exists() for out in outputs)
+
+    def _outputs(self, key):
+        """(folder, extension) pairs a target writes each input to."""
+        settings = self.targets.get(key, {})
+        ext = OUTPUT_EXTENSIONS.get(settings.get("format"))
+        return {(folder, ext) for folder in settings.get("folders", ())}
+
+    def record(self, img_file, keys):
+        """Note that img_file's current contents were rendered for the target keys.
+
+        Targets recorded earlier are kept, except those whose output files
+        the new targets replaced.
+        """
+        try:
+            st = os.stat(img_file)
+            digest = file_digest(img_file)
+        except OSError:
+            return
+        entry = self.inputs.get(str(img_file))
+        done = set(keys)
+        if entry is not None and entry["sha256"] == digest:
+            # Earlier targets still stand unless these ones overwrote their files
+            written = set().union(*(self._outputs(key) for key in keys))
+            done.update(key for key in entry["targets"]
+                        if key in self.targets and not self._outputs(key) & written)
+        self.inputs[str(img_file)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                      "sha256": digest, "targets": sorted(done)}
+
+    def save(self):
+        """Write the manifest atomically; keys no input refers to are dropped."""
+        used = {key for entry in self.inputs.values() for key in entry["targets"]}
+        data = {"version": _MANIFEST_VERSION,
+                "targets": {k: v for k, v in self.targets.items() if k in used},
+                "inputs": self.inputs}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # A read-only output folder only costs the next run its skips
+
+
+JOURNAL_NAME = ".resizer-journal.jsonl"
+
+
+class RunJournal:
+    """Append-only log of the finished units of the run in progress in an output folder.
+
+    The first line holds the job — run_batch()'s arguments — so an
+    interrupted run can be resumed with the same settings. Each further line
+    names one input and the RunManifest key of a target written for it; a
+    unit is journaled only after its files were renamed into place, and
+    every image's lines are fsynced before the next image is reported, so a
+    crash loses at most the units in flight. The journal is removed when its
+    run finishes.
+    """
+
+    def __init__(self, output_base):
+        self.path = Path(output_base) / JOURNAL_NAME
+        self._file = None
+
+    def read(self):
+        """(job, {input path: set of finished target keys}); job is None without a journal."""
+        job, done = None, {}
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return None, {}
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # The line being written when the run stopped
+            if "job" in entry:
+                job = entry["job"]
+            elif "file" in entry:
+                done.setdefault(entry["file"], set()).add(entry["target"])
+        return job, done
+
+    def begin(self, job):
+        """Start a new journal for job, replacing any earlier one."""
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write([{"job": job}])
+
+    def resume(self):
+        """Reopen the existing journal to append further units."""
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def add(self, img_file, keys):
+        if keys:
+            self._write([{"file": str(img_file), "target": key} for key in keys])
+
+    def _write(self, entries):
+        self._file.write("".join(json.dumps(e) + "\n" for e in entries))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """Close and delete the journal: the run is complete."""
+        self.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def resume_job(output_base):
+    """run_batch() arguments of the interrupted run in output_base, or None.
+
+    Pass them back with resume=True to continue the run where it stopped.
+    """
+    job, _ = RunJournal(output_base).read()
+    if job is None:
+        return None
+    job = dict(job)
+    if "scan" in job:
+        job["images"] = ImageScan(**job.pop("scan"))
+    else:
+        job["images"] = [Path(p) for p in job["images"]]
+    job["sizes"] = [(folder, tuple(dims)) for folder, dims in job["sizes"]]
+    return job
+
+
+def _glob_match(rel, patterns):
+    """Whether a relative path (with /) or its last part matches any glob pattern."""
+    name = rel.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def scan_images(input_dir, recursive=False, include=(), exclude=(), skip=()):
+    """Yield the supported images in input_dir, each folder as soon as it is read.
+
+    Folders are read with os.scandir one at a time, depth first, files
+    before subfolders and each sorted by name, so work can start while the
+    rest of a large archive is still unscanned. include and exclude are glob
+    patterns matched against the path relative to input_dir (with /) or the
+    bare name: when include patterns are given a file must match one, and
+    anything matching an exclude pattern — a whole subfolder included — is
+    left out. Hidden entries and the skip folders (such as an output folder
+    inside the input tree) are never read.
+    """
+    root = Path(input_dir)
+    skip = {os.path.normcase(os.path.abspath(p)) for p in skip}
+    stack = [(root, "")]
+    while stack:
+        folder, prefix = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            if folder is root:
+                raise
+            continue  # An unreadable subfolder must not stop the run
+        subfolders = []
+        for entry in entries:
+            rel = prefix + entry.name
+            if entry.name.startswith(".") or _glob_match(rel, exclude):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+            if is_dir:
+                if recursive and os.path.normcase(os.path.abspath(entry.path)) not in skip:
+                    subfolders.append((Path(entry.path), rel + "/"))
+            elif (is_file and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+                    and (not include or _glob_match(rel, include))):
+                yield Path(entry.path)
+        stack.extend(reversed(subfolders))
+
+
+class ImageScan:
+    """The images of an input folder for run_batch(), found as they are processed.
+
+    Iterating runs scan_images() afresh. run_batch() mirrors the subfolders
+    of root under the output folder, and journals the scan's settings
+    rather than a file list so a resumed run scans the same way.
+    """
+
+    def __init__(self, root, recursive=False, include=(), exclude=(), skip=()):
+        self.root = Path(root)
+        self.recursive = recursive
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.skip = [str(p) for p in skip]
+
+    def __iter__(self):
+        return scan_images(self.root, self.recursive, self.include, self.exclude, self.skip)
+
+    def spec(self):
+        return {"root": str(self.root), "recursive": self.recursive, "include": self.include,
+                "exclude": self.exclude, "skip": self.skip}
+
+
+def find_images(input_dir):
+    """Supported image files directly inside input_dir, sorted by name."""
+    return list(scan_images(input_dir))
+
+
+def run_batch(images, output_base, sizes, workflows, crop_mode="top", fmt="JPEG", quality=95,
+              bg_str="#FFFFFF", use_draft=True, use_mask_cache=True, tier="auto", workers=1,
+              force=False, resume=False, log=print, status=None, progress=None):
+    """Render every image at every size for every workflow, as one batch run.
+
+    images is a list of files or an ImageScan, which is processed as it is
+    scanned and has its subfolders mirrored in the output. sizes is
+    [(subfolder name or None, (width, height)), ...]; workflows is a
+    list of BG_WORKFLOWS keys, or [None] for resize-only. Images the output
+    folder's RunManifest shows as already rendered with these settings are
+    skipped unless force is set. Finished units are journaled as they
+    complete (see RunJournal); with resume, the units the interrupted run in
+    output_base finished are skipped — pass resume_job()'s arguments.
+    log(message) gets the run log, status(message) short progress notes and
+    progress(percent) the share of images done — None while the total is
+    still unknown, during a scan. Returns a summary dict:
+    per-target counts, every failure, the tier used and the cache statistics.
+    """
+    job = {"output_base": str(output_base),
+           "sizes": [[folder, list(dims)] for folder, dims in sizes],
+           "workflows": list(workflows), "crop_mode": crop_mode, "fmt": fmt, "quality": quality,
+           "bg_str": bg_str, "use_draft": use_draft, "use_mask_cache": use_mask_cache,
+           "tier": tier, "workers": workers, "force": force}
+    if isinstance(images, ImageScan):
+        job["scan"] = images.spec()
+        input_root = images.root
+    else:
+        job["images"] = [str(p) for p in images]
+        input_root = None
+    output_base = Path(output_base)
+    do_remove_bg = any(workflows)
+    # The background shows behind cutouts and around Fill's padding; nowhere else
+    uses_bg = do_remove_bg or crop_mode == "fill"
+    bg_spec = parse_bg_spec(bg_str if uses_bg else "#FFFFFF")
+    if uses_bg and bg_spec['type'] == 'transparent' and fmt == 'JPEG':
+        fmt = 'PNG'
+        log("⚠ JPEG doesn't support transparency. Switched to PNG.")
+    if not use_draft:
+        log("Fast JPEG decode off — decoding at full resolution.")
+
+    total_runs = len(workflows)
+    _background_cache.reset_stats()
+    _backdrop_cache.reset_stats()
+    _mask_cache.reset_stats()
+    _session_pool.reset_stats()
+    inference_stats.clear()
+    output_folders = []
+
+    # Presets that share dimensions are rendered once and written
+    # under each name.
+    size_groups = OrderedDict()
+    for folder, dims in sizes:
+        size_groups.setdefault(dims, []).append(folder)
+
+    # Each image is decoded once and fanned out to every workflow and
+    # size: a subfolder per size, then per workflow when several are
+    # selected.
+    targets = []
+    labels = []
+    for wf_key in workflows:
+        wf_label = BG_WORKFLOWS[wf_key]["label"] if wf_key else "Resize Only"
+        for dims, folders in size_groups.items():
+            paths = []
+            for folder in folders:
+                output_path = output_base / folder if folder else output_base
+                if total_runs > 1:
+                    output_path = output_path / wf_key
+                output_path.mkdir(parents=True, exist_ok=True)
+                output_folders.append(str(output_path))
+                paths.append(output_path)
+            targets.append((wf_key, dims, paths))
+            labels.append(f"{wf_label} @ {dims[0]}×{dims[1]}" if len(size_groups) > 1
+                          else wf_label)
+    total_targets = len(targets)
+
+    # Masks are shared by every size, so Auto goes by the largest
+    tier_how = "chosen"
+    if do_remove_bg and tier == "auto":
+        tier = auto_tier(max(w for w, _ in size_groups), max(h for _, h in size_groups))
+        tier_how = "auto"
+
+    manifest = RunManifest(output_base)
+    target_keys = []
+    for wf_key, (w, h), paths in targets:
+        target_keys.append(manifest.target_key({
+            "workflow": wf_key, "size": f"{w}x{h}", "crop": crop_mode, "format": fmt,
+            "quality": quality, "draft": use_draft,
+            # The background as rendered: an edited backdrop file changes its stamp
+            "bg": _background_key(bg_spec, w, h)[:2] if wf_key or crop_mode == "fill" else None,
+            "tier": tier if wf_key else None,
+            "folders": [p.relative_to(output_base).as_posix() for p in paths]}))
+    journal = RunJournal(output_base)
+    done = journal.read()[1] if resume else {}
+    ext = OUTPUT_EXTENSIONS[fmt]
+    count = len(images) if hasattr(images, "__len__") else None
+    skipped = resumed = 0
+    partly = OrderedDict()  # targets still needed -> images an interrupted run partly finished
+
+    def needing_all():
+        """Images that need every target, as they are found; the rest are set aside."""
+        nonlocal skipped, resumed
+        for img_file in images:
+            finished = done.get(str(img_file), ())
+            remaining = tuple(k for k, key in enumerate(target_keys) if key not in finished)
+            if not remaining:
+                resumed += 1
+                manifest.record(img_file, target_keys)
+            elif len(remaining) < total_targets:
+                partly.setdefault(remaining, []).append(img_file)
+            elif force or not manifest.up_to_date(
+                    img_file, target_keys,
+                    [p / (output_stem(img_file, input_root) + ext)
+                     for _, _, paths in targets for p in paths]):
+                yield img_file
+            else:
+                skipped += 1
+
+    def groups():
+        """(target indices, images) to render; partly finished images come last."""
+        yield tuple(range(total_targets)), needing_all()
+        yield from list(partly.items())  # Complete once needing_all() is exhausted
+
+    size_label = ", ".join(f"{w}×{h}" for w, h in size_groups)
+    bg_label = f" → bg: {bg_str}" if uses_bg else ""
+    what = f"{count} images" if count is not None else f"images in {input_root} as they are found"
+    log(f"Processing {what} → {size_label} ({crop_mode} crop, {fmt}){bg_label}")
+    if len(sizes) > len(size_groups):
+        log(f"{len(sizes)} sizes selected, {len(size_groups)} unique — "
+            "duplicates are copied, not re-rendered")
+    if do_remove_bg:
+        sides = sorted({inference_side(wf_key, tier) for wf_key in workflows})
+        log(f"Speed tier: {tier} ({'/'.join(map(str, sides))} px, {tier_how})")
+        for run_idx, wf_key in enumerate(workflows):
+            lab = BG_WORKFLOWS[wf_key]["label"]
+            log(f"🔄 Workflow {run_idx + 1}/{total_runs}: {lab}")
+            if not use_mask_cache:
+                # With the mask cache on, models load on the first cache miss
+                if status:
+                    status(f"Loading model: {lab}…")
+                _get_session(wf_key)
+    log("")
+
+    processed = [0] * total_targets
+    errors = [0] * total_targets
+    failures = []
+    scanned = []  # Images handed to the pipeline, by index
+
+    def position(i):
+        # Skipped images count too, so the last image reads n/n
+        n = skipped + resumed + i + 1
+        return f"{min(n, count)}/{count}" if count else str(n)
+
+    def on_target(i, k):
+        if status:
+            name = scanned[i].name
+            status(f"[{labels[k]}] {position(i)}: {name}" if total_targets > 1
+                   else f"Processing {position(i)}: {name}")
+
+    def outcomes():
+        """(index, target indices, result, error) for every image, group by group."""
+        for ks, group in groups():
+            start = len(scanned)
+            group_targets = [targets[k] for k in ks]
+
+            def jobs(group=group, group_targets=group_targets):
+                for img_file in group:
+                    scanned.append(img_file)
+                    yield (img_file, group_targets, crop_mode, fmt, quality, bg_spec,
+                           use_draft, use_mask_cache, tier, input_root)
+
+            parallel = not do_remove_bg and workers > 1 and count != 1
+            if parallel:
+                # Resize-only work is CPU-bound and independent per image
+                results = run_parallel(process_file, jobs(), min(workers, count or workers))
+            else:
+                results = run_batched(
+                    jobs(), lambda j, k, start=start, ks=ks: on_target(start + j, ks[k]), status)
+            for j, result, error in results:
+                if parallel and status:
+                    # Workers render every target at once; report each image as it lands
+                    status(f"Processing {position(start + j)}: {scanned[start + j].name}")
+                yield start + j, ks, result, error
+
+    if resume and journal.read()[0] is not None:
+        journal.resume()
+    else:
+        journal.begin(job)
+    if progress and count is None:
+        progress(None)
+    # Every batch cycles through all the workflows; keep their models loaded
+    pinned = [_session_spec(wf_key)[0] for wf_key in workflows if wf_key]
+    _session_pool.pin(pinned)
+    try:
+        for i, ks, result, error in outcomes():
+            img_file = scanned[i]
+            name = output_stem(img_file, input_root) + img_file.suffix
+            if error is not None:
+                # Decode failed — no workflow could run on this image
+                for k in ks:
+                    errors[k] += 1
+                failures.append({"file": str(img_file), "target": None, "error": str(error)})
+                log(f"  ✗ [{position(i)}] {name}: {error}")
+            else:
+                orig_size, target_errors = result
+                for k, err in zip(ks, target_errors):
+                    if err is None:
+                        processed[k] += 1
+                        continue
+                    errors[k] += 1
+                    failures.append({"file": str(img_file), "target": labels[k], "error": str(err)})
+                    where = f" [{labels[k]}]" if total_targets > 1 else ""
+                    log(f"  ✗ [{position(i)}] {name}{where}: {err}")
+                if not any(target_errors):
+                    log(f"  ✓ [{position(i)}] {name} ({orig_size})")
+                finished = [target_keys[k] for k, err in zip(ks, target_errors) if err is None]
+                journal.add(img_file, finished)
+                manifest.record(img_file, finished + list(done.get(str(img_file), ())))
+            if progress and count:
+                progress(min(100, (skipped + resumed + i + 1) / count * 100))
+    except BaseException:
+        journal.close()  # Kept, so the run can be resumed
+        raise
+    finally:
+        _session_pool.unpin(pinned)
+        manifest.save()
+    journal.finish()
+    if progress:
+        progress(100)
+
+    if resume:
+        partly_count = sum(len(group) for group in partly.values())
+        log(f"\n↩ Resumed: {resumed} images were already finished"
+            + (f", {partly_count} partly finished" if partly_count else ""))
+    if skipped:
+        log(f"\n⏭ {skipped} unchanged since the last run with these settings — skipped "
+            f"(force a full run to redo them)")
+    for lab, p, e in zip(labels, processed, errors):
+        log(f"\n  ✅ {lab}: {p} processed, {e} errors")
+    grand_processed = sum(processed)
+    grand_errors = sum(errors)
+
+    # Final summary
+    if total_targets > 1:
+        log(f"\n{'━' * 50}\n📊 All outputs complete: "
+            f"{grand_processed} total processed, {grand_errors} total errors\n"
+            f"Output folders: {', '.join(output_folders)}")
+
+    if _background_cache.hits or _background_cache.misses:
+        log(f"Background cache: {_background_cache.summary()}")
+    if _backdrop_cache.hits or _backdrop_cache.misses:
+        log(f"Backdrop image cache: {_backdrop_cache.summary()}")
+    if _mask_cache.hits or _mask_cache.misses:
+        log(f"Mask cache: {_mask_cache.hits} reused, {_mask_cache.misses} inferred")
+    if _session_pool.loads or _session_pool.hits:
+        log(f"Model sessions: {_session_pool.summary()}")
+    for (t, side), (n, seconds) in sorted(inference_stats.items()):
+        log(f"Inference ({t}, {side} px): {n} masks, {seconds / n:.2f}s per image")
+
+    return {
+        "images": len(scanned) + skipped + resumed,
+        "skipped": skipped,
+        "resumed": resumed,
+        "processed": grand_processed,
+        "errors": grand_errors,
+        "format": fmt,
+        "tier": tier if do_remove_bg else None,
+        "targets": [
+            {"label": lab, "workflow": wf_key, "size": f"{w}x{h}",
+             "folders": [str(p) for p in paths], "processed": p_count, "errors": e_count}
+            for lab, (wf_key, (w, h), paths), p_count, e_count
+            in zip(labels, targets, processed, errors)
+        ],
+        "failures": failures,
+        "mask_cache": {"reused": _mask_cache.hits, "inferred": _mask_cache.misses},
+        "inference": {f"{t}@{side}": {"masks": n, "seconds": round(sec, 3)}
+                      for (t, side), (n, sec) in inference_stats.items()},
+    }
+
+
+WATCH_SETTLE_SECONDS = 2.0
+WATCH_POLL_SECONDS = 2.0
+# A file inotify saw being written but never closed is taken after this long unchanged
+WATCH_OPEN_SECONDS = 60.0
+# Smaller watch batches resize in-process: starting a worker pool costs more than it saves
+WATCH_POOL_MIN_IMAGES = 16
+
+
+class _Inotify:
+    """Linux inotify on one folder, via ctypes: which files are being written or are done."""
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    _EVENT = struct.Struct("iIII")  # struct inotify_event before the name: wd, mask, cookie, len
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        """Block up to timeout seconds for events.
+
+        Returns {name: True if its writer has finished (closed or moved it
+        in), False if it is still being written}, from each file's last event.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return {}
+        done = self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+        events = {}
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos + self._EVENT.size <= len(data):
+                _, mask, _, length = self._EVENT.unpack_from(data, pos)
+                pos += self._EVENT.size
+                name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+                pos += length
+                if name:
+                    events[name] = bool(mask & done)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """New images in a folder, handed out once they have finished arriving.
+
+    With inotify, a file is ready as soon as its writer closes it (or it is
+    moved in). Otherwise — polling, or writers inotify cannot see such as
+    other machines on a network share — it is ready once its size and mtime
+    have not changed for settle seconds. The folder is rescanned every
+    interval seconds either way, and a file is handed out again if it is
+    overwritten.
+    """
+
+    def __init__(self, folder, settle=WATCH_SETTLE_SECONDS, interval=WATCH_POLL_SECONDS,
+                 include_existing=True):
+        self.folder = Path(folder)
+        self.settle = settle
+        self.interval = interval
+        # path -> [(size, mtime_ns), first seen, last changed, writer done: True/False/None unknown]
+        self._pending = {}
+        self._done = {}  # path -> (size, mtime_ns) when handed out
+        try:
+            self._inotify = _Inotify(self.folder)
+        except (OSError, AttributeError):
+            self._inotify = None  # Not Linux, or no inotify — poll only
+        if not include_existing:
+            self._done = dict(self._scan())
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "polling"
+
+    def _scan(self):
+        for path in find_images(self.folder):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # Removed while scanning
+            yield path, (st.st_size, st.st_mtime_ns)
+
+    def _update(self, events):
+        now = time.monotonic()
+        seen = set()
+        for path, sig in self._scan():
+            seen.add(path)
+            entry = self._pending.get(path)
+            writer_done = events.get(path.name)
+            if entry is None:
+                if self._done.get(path) == sig:
+                    continue
+                self._pending[path] = [sig, now, now, writer_done]
+                continue
+            if entry[0] != sig:
+                # Changed again: still being written unless it was closed since
+                entry[:3] = sig, entry[1], now
+                if writer_done is None and entry[3]:
+                    entry[3] = None
+            if writer_done is not None:
+                entry[3] = writer_done
+        for path in set(self._pending) - seen:
+            del self._pending[path]
+
+    def _wait_left(self, entry, now):
+        """Seconds until a pending entry is ready (0 when it is)."""
+        _, _, changed, writer_done = entry
+        if writer_done:
+            return 0.0
+        return changed + (WATCH_OPEN_SECONDS if writer_done is False else self.settle) - now
+
+    def ready(self):
+        """Pending files that have finished arriving, oldest first; marks them handed out."""
+        now = time.monotonic()
+        ready = [path for path, entry in self._pending.items()
+                 if entry[0][0] > 0 and self._wait_left(entry, now) <= 0]
+        ready.sort(key=lambda path: self._pending[path][1])
+        return ready
+
+    def batches(self, stop):
+        """Yield (files, first seen) for arrivals until the stop event is set.
+
+        first seen is the monotonic time the batch's oldest file appeared, so
+        callers can report drop-to-output latency.
+        """
+        events = {}
+        while not stop.is_set():
+            self._update(events)
+            batch = self.ready()
+            if batch:
+                first_seen = self._pending[batch[0]][1]
+                for path in batch:
+                    self._done[path] = self._pending.pop(path)[0]
+                yield batch, first_seen
+                events = {}
+                continue
+            # Wake early enough to hand out the next file as soon as it is ready
+            now = time.monotonic()
+            timeout = min([self.interval] + [max(0.05, self._wait_left(entry, now))
+                                             for entry in self._pending.values()])
+            if self._inotify:
+                events = self._inotify.wait(timeout)
+            else:
+                stop.wait(timeout)
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8765
+SERVE_MAX_CONCURRENT = 8        # requests decoding, waiting for a mask or encoding at once
+SERVE_QUEUE_SECONDS = 30.0      # how long a request waits for a slot before a 503
+SERVE_BATCH_WAIT_SECONDS = 0.02  # how long a mask request waits for others to batch with
+SERVE_MAX_BODY = 64 * 1_048_576
+SERVE_MAX_PIXELS = 16_000_000    # largest output size accepted (e.g. 4000 × 4000)
+SERVE_ROUTES = ("/resize", "/cutout")
+_CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+class MaskBatcher:
+    """Coalesces mask requests from concurrent threads into batched get_masks() calls.
+
+    One inference thread serves every caller. Requests for the same workflow
+    and tier that arrive within max_wait seconds of each other, up to the
+    workflow's batch_size, run as a single model batch; onnxruntime already
+    spreads each batch over every core.
+    """
+
+    def __init__(self, max_wait=SERVE_BATCH_WAIT_SECONDS):
+        self.max_wait = max_wait
+        self._queue = deque()  # ((workflow, tier), image, content hash, Future)
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.images = 0
+        self.seconds = 0.0
+        threading.Thread(target=self._run, name="mask-batcher", daemon=True).start()
+
+    def mask(self, img, workflow_key, content_hash=None, tier="max"):
+        """The mask for img, predicted in a batch with any concurrent requests."""
+        future = Future()
+        with self._cond:
+            self._queue.append(((workflow_key, tier), img, content_hash, future))
+            self._cond.notify()
+        return future.result()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _take(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            key = self._queue[0][0]
+            limit = max(1, BG_WORKFLOWS[key[0]].get("batch_size", 1))
+            deadline = time.monotonic() + self.max_wait
+            while sum(item[0] == key for item in self._queue) < limit:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            batch = [item for item in self._queue if item[0] == key][:limit]
+            for item in batch:
+                self._queue.remove(item)
+            return key, batch
+
+    def _run(self):
+        while True:
+            (workflow_key, tier), batch = self._take()
+            t0 = time.perf_counter()
+            try:
+                masks = get_masks([item[1] for item in batch], workflow_key,
+                                  [item[2] for item in batch], tier)
+            except Exception as e:
+                for item in batch:
+                    item[3].set_exception(e)
+                continue
+            self.batches += 1
+            self.images += len(batch)
+            self.seconds += time.perf_counter() - t0
+            for item, mask in zip(batch, masks):
+                item[3].set_result(mask)
+
+
+class ServiceMetrics:
+    """Request counters and timings for the /metrics endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # (endpoint, status) -> count
+        self.seconds = {}   # endpoint -> total seconds of successful requests
+        self.in_flight = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self.requests[endpoint, status] = self.requests.get((endpoint, status), 0) + 1
+            if status == 200:
+                self.seconds[endpoint] = self.seconds.get(endpoint, 0.0) + seconds
+
+    def render(self, batcher):
+        """Prometheus text exposition of the counters, the batcher and the caches."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP resizer_{name} {help_text}")
+            lines.append(f"# TYPE resizer_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"resizer_{name}{{{label_str}}} {value}" if label_str
+                             else f"resizer_{name} {value}")
+
+        with self._lock:
+            requests = sorted(self.requests.items())
+            seconds = sorted(self.seconds.items())
+        metric("requests_total", "counter", "HTTP requests by endpoint and status code.",
+               [({"endpoint": e, "code": c}, n) for (e, c), n in requests])
+        metric("request_seconds_total", "counter", "Time spent on successful requests.",
+               [({"endpoint": e}, round(t, 6)) for e, t in seconds])
+        metric("requests_in_flight", "gauge", "Requests holding a processing slot.",
+               [({}, self.in_flight)])
+        metric("requests_rejected_total", "counter", "Requests turned away with 503 (no free slot).",
+               [({}, self.rejected)])
+        metric("mask_queue_length", "gauge", "Mask requests waiting for the inference thread.",
+               [({}, len(batcher))])
+        metric("inference_batches_total", "counter", "Batched model runs.", [({}, batcher.batches)])
+        metric("inference_images_total", "counter", "Masks produced by batched runs.",
+               [({}, batcher.images)])
+        metric("inference_seconds_total", "counter", "Time spent in batched mask runs.",
+               [({}, round(batcher.seconds, 6))])
+        metric("mask_cache_hits_total", "counter", "Masks reused from the mask cache.",
+               [({}, _mask_cache.hits)])
+        metric("mask_cache_misses_total", "counter", "Masks that had to be inferred.",
+               [({}, _mask_cache.misses)])
+        metric("sessions_resident", "gauge", "Model sessions loaded in the pool.",
+               [({}, len(_session_pool))])
+        metric("session_loads_total", "counter", "Model sessions loaded.", [({}, _session_pool.loads)])
+        metric("session_unloads_total", "counter", "Model sessions unloaded.",
+               [({}, _session_pool.unloads)])
+        metric("background_cache_hits_total", "counter", "Background canvases reused.",
+               [({}, _background_cache.hits)])
+        metric("uptime_seconds", "gauge", "Seconds since the service started.",
+               [({}, round(time.time() - self.started, 3))])
+        return "\n".join(lines) + "\n"
+
+
+class ServiceError(Exception):
+    """A request the service refuses, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _query_param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def render_request(body, query, wf_key, batcher, use_draft=True, use_mask_cache=True):
+    """Render one uploaded image for POST /resize (wf_key None) or /cutout.
+
+    query holds the parse_qs() parameters: size (WxH), crop, format, quality,
+    bg (a parse_bg_spec string or background preset name) and, for cutouts,
+    tier. Returns (encoded bytes, format).
+    """
+    cutout = wf_key is not None
+    try:
+        width, height = _parse_size(_query_param(query, "size", "500x500"))
+        quality = int(_query_param(query, "quality", "95"))
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        raise ServiceError(400, str(e))
+    if not 1 <= quality <= 100:
+        raise ServiceError(400, "quality must be between 1 and 100")
+    if width * height > SERVE_MAX_PIXELS:
+        raise ServiceError(400, f"size {width}x{height} is larger than "
+                                f"{SERVE_MAX_PIXELS / 1e6:g} megapixels")
+    crop_mode = _query_param(query, "crop", "top")
+    if crop_mode not in ("top", "center", "fill"):
+        raise ServiceError(400, f"crop must be top, center or fill, not {crop_mode!r}")
+    bg_str = _query_param(query, "bg", "TRANSPARENT" if cutout else "#FFFFFF")
+    bg_label = _find_preset(bg_str, HeadshotResizerApp.BG_PRESETS)
+    if bg_label:
+        bg_str = HeadshotResizerApp.BG_PRESETS[bg_label]
+    # Decided from the string alone: whether a server path exists is not the client's business
+    if bg_str.upper() != "TRANSPARENT" and not any(is_hex_color(p) for p in bg_str.split(":")):
+        raise ServiceError(400, "bg must be a colour, gradient, TRANSPARENT or background "
+                                "preset name (image files are not accepted over HTTP)")
+    bg_spec = parse_bg_spec(bg_str, files=False)
+    transparent = cutout and bg_spec["type"] == "transparent"
+    fmt = _query_param(query, "format", "PNG" if transparent else "JPEG").upper()
+    if fmt not in OUTPUT_EXTENSIONS:
+        raise ServiceError(400, f"format must be one of {', '.join(OUTPUT_EXTENSIONS)}")
+    if transparent and fmt == "JPEG":
+        fmt = "PNG"  # JPEG has no alpha, as in batch runs
+
+    if cutout:
+        workflows = available_workflows()
+        if wf_key not in workflows:
+            raise ServiceError(400, f"workflow must be one of {', '.join(workflows)}")
+        tier = _query_param(query, "tier", "auto")
+        if tier == "auto":
+            tier = auto_tier(width, height)
+        elif tier not in SPEED_TIERS:
+            raise ServiceError(400, f"tier must be auto or one of {', '.join(SPEED_TIERS)}")
+
+    try:
+        with Image.open(io.BytesIO(body)) as probe:
+            pixels = probe.width * probe.height
+        # Refused past Pillow's decompression-bomb limit, where it would only warn
+        if Image.MAX_IMAGE_PIXELS and pixels > Image.MAX_IMAGE_PIXELS:
+            raise ServiceError(400, f"image has {pixels} pixels, more than the "
+                                    f"{Image.MAX_IMAGE_PIXELS} accepted")
+        img, _ = prepare_image(io.BytesIO(body), width, height, crop_mode, use_draft,
+                               for_ai=bool(wf_key))
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise ServiceError(400, f"cannot decode image: {e}")
+    mask = None
+    if wf_key:
+        content_hash = hashlib.sha256(body).hexdigest() if use_mask_cache else None
+        mask = batcher.mask(img, wf_key, content_hash, tier)
+    out = render_image(img, width, height, crop_mode, bg_spec, wf_key, mask)
+    buffer = io.BytesIO()
+    encode_image(out, buffer, fmt, quality)
+    return buffer.getvalue(), fmt
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP front end of ResizerService; the server object carries the shared state."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "DHGResizer/1.5"
+
+    def _send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=()):
+        self._send(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            self._send(200, service.metrics.render(service.batcher).encode(),
+                       "text/plain; version=0.0.4")
+        elif path == "/health":
+            self._send_json(200, {"status": "ok", "workflows": available_workflows()})
+        else:
+            self._send_json(404, {"error": f"no such endpoint: {path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        endpoint = url.path
+        start = time.perf_counter()
+        status = 500
+        body = None
+        try:
+            if endpoint not in SERVE_ROUTES:
+                endpoint = "other"  # Keeps the metrics' label set bounded
+                raise ServiceError(404, f"no such endpoint: {url.path}")
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                raise ServiceError(400, "Content-Length must be a number")
+            if length <= 0:
+                raise ServiceError(400, "send the image as the request body")
+            if length > SERVE_MAX_BODY:
+                raise ServiceError(413, f"image larger than {SERVE_MAX_BODY // 1_048_576} MB")
+            query = parse_qs(url.query)
+            wf_key = None
+            if endpoint == "/cutout":
+                if not service.ai_available:
+                    raise ServiceError(501, "rembg is not installed on the server")
+                wf_key = _query_param(query, "workflow", "portrait")
+            # The slot is taken before the body is read, so --max-concurrent
+            # also bounds the memory held by uploads
+            with service.slot():
+                body = self.rfile.read(length)
+                data, fmt = service.render(body, query, wf_key)
+            status = 200
+            self._send(200, data, _CONTENT_TYPES[fmt],
+                       [("X-Processing-Seconds", f"{time.perf_counter() - start:.3f}")])
+        except ServiceError as e:
+            status = e.status
+            if body is None:
+                self.close_connection = True  # The unread body would follow on this connection
+            headers = [("Retry-After", "1")] if status == 503 else []
+            self._send_json(status, {"error": str(e)}, headers)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+        finally:
+            service.metrics.record(endpoint, status, time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        self.server.service.log(f"{self.address_string()} {format % args}")
+
+
+class ResizerService:
+    """Long-running HTTP service over the batch engine.
+
+    POST an image to /resize or /cutout with query parameters (see
+    render_request) to get the encoded result back; GET /metrics and
+    /health report on it. Requests share the session pool, mask cache and
+    background caches, at most max_concurrent are processed at a time, and
+    concurrent cutouts are batched through one MaskBatcher.
+    """
+
+    def __init__(self, host=SERVE_HOST, port=SERVE_PORT, max_concurrent=SERVE_MAX_CONCURRENT,
+                 queue_seconds=SERVE_QUEUE_SECONDS, use_draft=True, use_mask_cache=True, log=print):
+        self.batcher = MaskBatcher()
+        self.metrics = ServiceMetrics()
+        self.queue_seconds = queue_seconds
+        self.use_draft = use_draft
+        self.use_mask_cache = use_mask_cache
+        self.log = log
+        self.ai_available = True
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.httpd = ThreadingHTTPServer((host, port), _ServiceHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = self
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one of the max_concurrent processing slots; 503 if none frees up in time."""
+        if not self._slots.acquire(timeout=self.queue_seconds):
+            self.metrics.reject()
+            raise ServiceError(503, "server busy, try again")
+        self.metrics.enter()
+        try:
+            yield
+        finally:
+            self.metrics.leave()
+            self._slots.release()
+
+    def render(self, body, query, wf_key=None):
+        """render_request() with this service's batcher and settings; call within slot()."""
+        return render_request(body, query, wf_key, self.batcher,
+                              self.use_draft, self.use_mask_cache)
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
 # ---------------------------------------------------------------------------
 # GUI Application
 # ---------------------------------------------------------------------------
 
+def _split_patterns(text):
+    """Glob patterns from a comma-separated entry."""
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
 class HeadshotResizerApp:
     """Tkinter GUI for batch headshot resizing."""
 
@@ -401,20 +3067,31 @@ class HeadshotResizerApp:
 
         # Variables
         self.input_dir = tk.StringVar()
+        self.recursive = tk.BooleanVar(value=False)
+        self.include_patterns = tk.StringVar()
+        self.exclude_patterns = tk.StringVar()
         self.output_dir = tk.StringVar()
         self.size_preset = tk.StringVar(value="500 × 500 — Headshot (Web)")
         self.custom_width = tk.StringVar(value="500")
         self.custom_height = tk.StringVar(value="500")
+        self.multi_size = tk.BooleanVar(value=False)
+        self.selected_sizes = []
         self.crop_mode = tk.StringVar(value="top")
         self.output_format = tk.StringVar(value="JPEG")
         self.quality = tk.IntVar(value=95)
+        self.fast_decode = tk.BooleanVar(value=True)
+        self.force = tk.BooleanVar(value=False)
+        self.workers = tk.IntVar(value=DEFAULT_WORKERS)
         self.remove_bg = tk.BooleanVar(value=False)
-        self.wf_portrait = tk.BooleanVar(value=False)
-        self.wf_general = tk.BooleanVar(value=False)
-        self.wf_bria = tk.BooleanVar(value=False)
+        # Fast workflows appear once tools/quantize_models.py has made their INT8 model
+        self.wf_vars = {wf_key: tk.BooleanVar(value=False) for wf_key in available_workflows()}
         self.bg_preset = tk.StringVar(value="White (#FFFFFF)")
         self.custom_bg = tk.StringVar(value="#E0E0E0")
+        self.use_mask_cache = tk.BooleanVar(value=True)
+        self.speed_tier = tk.StringVar(value="Auto")
         self.is_processing = False
+        self._warm_thread = None
+        self._warm_again = False
 
         self._build_ui()
         self._center_window()
@@ -469,6 +3146,17 @@ class HeadshotResizerApp:
             row=0, column=0, sticky="ew", padx=(0, 8))
         ttk.Button(input_frame, text="Browse…", command=self._browse_input).grid(
             row=0, column=1)
+
+        scan_frame = ttk.Frame(input_frame)
+        scan_frame.grid(row=1, column=0, columnspan=2, sticky="w", pady=(4, 0))
+        ttk.Checkbutton(scan_frame, text="Include subfolders", variable=self.recursive).grid(
+            row=0, column=0, padx=(0, 12))
+        ttk.Label(scan_frame, text="Include:").grid(row=0, column=1, padx=(0, 4))
+        ttk.Entry(scan_frame, textvariable=self.include_patterns, width=14).grid(row=0, column=2)
+        ttk.Label(scan_frame, text="Exclude:").grid(row=0, column=3, padx=(8, 4))
+        ttk.Entry(scan_frame, textvariable=self.exclude_patterns, width=14).grid(row=0, column=4)
+        ttk.Label(scan_frame, text="globs, comma-separated — e.g. day1/*, *_raw*",
+                  font=("Helvetica", 9), foreground="gray").grid(row=0, column=5, padx=(8, 0))
         row += 1
 
         # --- Output folder ---
@@ -496,11 +3184,30 @@ class HeadshotResizerApp:
             row=row, column=0, sticky="w", pady=(5, 2))
         row += 1
 
-        size_combo = ttk.Combobox(main, textvariable=self.size_preset,
-                                   values=list(self.SIZE_PRESETS.keys()),
-                                   state="readonly", width=48)
-        size_combo.grid(row=row, column=0, columnspan=2, sticky="w", pady=(0, 4))
-        size_combo.bind("<<ComboboxSelected>>", self._on_size_change)
+        self.size_combo = ttk.Combobox(main, textvariable=self.size_preset,
+                                       values=list(self.SIZE_PRESETS.keys()),
+                                       state="readonly", width=48)
+        self.size_combo.grid(row=row, column=0, columnspan=2, sticky="w", pady=(0, 4))
+        self.size_combo.bind("<<ComboboxSelected>>", self._on_size_change)
+        ttk.Checkbutton(main, text="Multiple sizes", variable=self.multi_size,
+                        command=self._toggle_multi_size).grid(row=row, column=2, sticky="w")
+        row += 1
+
+        # Multi-size list (hidden by default) — one subfolder per selected size
+        self.size_list_frame = ttk.Frame(main)
+        self.size_list_frame.grid(row=row, column=0, columnspan=3, sticky="ew", pady=(0, 8))
+        self.size_list_frame.columnconfigure(0, weight=1)
+        self.size_listbox = tk.Listbox(self.size_list_frame, selectmode="multiple", height=8,
+                                       exportselection=False)
+        for label in self.SIZE_PRESETS:
+            if label != "Custom...":
+                self.size_listbox.insert("end", label)
+        self.size_listbox.grid(row=0, column=0, sticky="ew")
+        size_scroll = ttk.Scrollbar(self.size_list_frame, orient="vertical",
+                                    command=self.size_listbox.yview)
+        size_scroll.grid(row=0, column=1, sticky="ns")
+        self.size_listbox.configure(yscrollcommand=size_scroll.set)
+        self.size_list_frame.grid_remove()
         row += 1
 
         # Custom size frame (hidden by default)
@@ -546,6 +3253,24 @@ class HeadshotResizerApp:
         ttk.Label(fmt_frame, text="Quality:").grid(row=0, column=4, padx=(16, 4))
         ttk.Spinbox(fmt_frame, from_=50, to=100, textvariable=self.quality,
                     width=4).grid(row=0, column=5)
+
+        row += 1
+
+        # --- Performance ---
+        perf_frame = ttk.Frame(main)
+        perf_frame.grid(row=row, column=0, columnspan=3, sticky="w", pady=(0, 8))
+
+        ttk.Label(perf_frame, text="Performance:", font=("Helvetica", 11, "bold")).grid(
+            row=0, column=0, padx=(0, 8))
+        ttk.Checkbutton(perf_frame, text="Fast JPEG decode", variable=self.fast_decode).grid(
+            row=0, column=1, padx=(0, 16))
+        ttk.Label(perf_frame, text="Parallel workers:").grid(row=0, column=2, padx=(0, 4))
+        ttk.Spinbox(perf_frame, from_=1, to=max(64, DEFAULT_WORKERS), textvariable=self.workers,
+                    width=4).grid(row=0, column=3)
+        ttk.Label(perf_frame, text="(resize-only runs)", font=("Helvetica", 9),
+                  foreground="gray").grid(row=0, column=4, padx=(6, 0))
+        ttk.Checkbutton(perf_frame, text="Reprocess unchanged images", variable=self.force).grid(
+            row=1, column=1, columnspan=4, sticky="w", pady=(4, 0))
         row += 1
 
         # --- Separator ---
@@ -566,34 +3291,37 @@ class HeadshotResizerApp:
         self.wf_frame.columnconfigure(0, weight=1)
 
         wf_row = 0
-        # Portrait workflow
-        ttk.Checkbutton(self.wf_frame, text="🎯 Portrait (BiRefNet-Portrait)",
-                        variable=self.wf_portrait,
-                        style="Toolbutton").grid(row=wf_row, column=0, sticky="w")
-        wf_row += 1
-        ttk.Label(self.wf_frame,
-                  text="    Best for headshots and people. Exceptional hair and shoulder edge quality.",
-                  font=("Helvetica", 9), foreground="gray").grid(row=wf_row, column=0, sticky="w")
-        wf_row += 1
-
-        # General workflow
-        ttk.Checkbutton(self.wf_frame, text="🌐 General Purpose (BiRefNet-General)",
-                        variable=self.wf_general,
-                        style="Toolbutton").grid(row=wf_row, column=0, sticky="w", pady=(4, 0))
-        wf_row += 1
-        ttk.Label(self.wf_frame,
-                  text="    Best all-around model. Great for products, objects, and mixed content.",
-                  font=("Helvetica", 9), foreground="gray").grid(row=wf_row, column=0, sticky="w")
+        for wf_key in self.wf_vars:
+            wf = BG_WORKFLOWS[wf_key]
+            ttk.Checkbutton(self.wf_frame, text=f"{wf['icon']} {wf['label']}",
+                            variable=self.wf_vars[wf_key], command=self._warm_up_selected,
+                            style="Toolbutton").grid(row=wf_row, column=0, sticky="w",
+                                                     pady=(4, 0) if wf_row else 0)
+            wf_row += 1
+            ttk.Label(self.wf_frame, text=f"    {wf['description']}",
+                      font=("Helvetica", 9), foreground="gray").grid(row=wf_row, column=0, sticky="w")
+            wf_row += 1
+
+        # Speed tier
+        tier_frame = ttk.Frame(self.wf_frame)
+        tier_frame.grid(row=wf_row, column=0, sticky="w", pady=(8, 0))
         wf_row += 1
-
-        # BRIA workflow
-        ttk.Checkbutton(self.wf_frame, text="✨ High Detail (BRIA RMBG)",
-                        variable=self.wf_bria,
-                        style="Toolbutton").grid(row=wf_row, column=0, sticky="w", pady=(4, 0))
-        wf_row += 1
-        ttk.Label(self.wf_frame,
-                  text="    State-of-the-art by BRIA AI. Excels at complex scenes and fine textures.",
-                  font=("Helvetica", 9), foreground="gray").grid(row=wf_row, column=0, sticky="w")
+        ttk.Label(tier_frame, text="Speed tier:").grid(row=0, column=0, padx=(0, 6))
+        ttk.Combobox(tier_frame, textvariable=self.speed_tier, state="readonly", width=20,
+                     values=["Auto"] + [f"{t.title()} ({side} px)" for t, side in SPEED_TIERS.items()]
+                     ).grid(row=0, column=1)
+        ttk.Label(tier_frame, text="Auto picks by output size — Draft for avatars, Max for print",
+                  font=("Helvetica", 9), foreground="gray").grid(row=0, column=2, padx=(8, 0))
+
+        # Mask cache
+        cache_frame = ttk.Frame(self.wf_frame)
+        cache_frame.grid(row=wf_row, column=0, sticky="w", pady=(8, 0))
+        ttk.Checkbutton(cache_frame, text="Reuse masks from earlier runs",
+                        variable=self.use_mask_cache).grid(row=0, column=0, padx=(0, 12))
+        ttk.Button(cache_frame, text="Clear Mask Cache",
+                   command=self._purge_mask_cache).grid(row=0, column=1)
+        ttk.Button(cache_frame, text="Unload Models",
+                   command=self._release_models).grid(row=0, column=2, padx=(6, 0))
 
         self.wf_frame.grid_remove()  # Hidden until master checkbox enabled
         row += 1
@@ -638,7 +3366,9 @@ class HeadshotResizerApp:
 
         # --- Process button ---
         self.process_btn = ttk.Button(main, text="▶  Process Images", command=self._start_processing)
-        self.process_btn.grid(row=row, column=0, columnspan=3, sticky="ew", pady=(8, 8), ipady=8)
+        self.process_btn.grid(row=row, column=0, columnspan=2, sticky="ew", pady=(8, 8), ipady=8)
+        self.resume_btn = ttk.Button(main, text="↻  Resume", command=self._start_resume)
+        self.resume_btn.grid(row=row, column=2, sticky="ew", padx=(6, 0), pady=(8, 8), ipady=8)
         row += 1
 
         # --- Progress ---
@@ -677,10 +3407,10 @@ class HeadshotResizerApp:
             # Auto-set output if empty
             if not self.output_dir.get():
                 self.output_dir.set(str(Path(path) / "resized"))
-            # Count images
-            count = sum(1 for f in Path(path).iterdir()
-                       if f.is_file() and f.suffix.lower() in SUPPORTED_EXTENSIONS)
-            self._log(f"Selected input: {path} ({count} images found)")
+            # Count images — subfolders are only scanned when processing
+            count = len(find_images(path))
+            self._log(f"Selected input: {path} ({count} images found"
+                      + (", plus subfolders" if self.recursive.get() else "") + ")")
 
     def _browse_output(self):
         path = filedialog.askdirectory(title="Select output folder")
@@ -693,6 +3423,16 @@ class HeadshotResizerApp:
         else:
             self.custom_size_frame.grid_remove()
 
+    def _toggle_multi_size(self):
+        if self.multi_size.get():
+            self.size_list_frame.grid()
+            self.custom_size_frame.grid_remove()
+            self.size_combo.configure(state="disabled")
+        else:
+            self.size_list_frame.grid_remove()
+            self.size_combo.configure(state="readonly")
+            self._on_size_change()
+
     def _on_bg_change(self, event=None):
         if self.bg_preset.get() == "Custom...":
             self.custom_bg_frame.grid()
@@ -705,13 +3445,80 @@ class HeadshotResizerApp:
             self.bg_frame.grid()
             self.bg_note.grid()
             # Default to Portrait if nothing selected
-            if not any([self.wf_portrait.get(), self.wf_general.get(), self.wf_bria.get()]):
-                self.wf_portrait.set(True)
+            if not any(var.get() for var in self.wf_vars.values()):
+                self.wf_vars["portrait"].set(True)
+            self._warm_up_selected()
         else:
             self.wf_frame.grid_remove()
             self.bg_frame.grid_remove()
             self.bg_note.grid_remove()
 
+    def _warm_up_selected(self):
+        """Load the selected workflows' models in the background, ahead of a run."""
+        if not self.remove_bg.get():
+            return
+        if self._warm_thread and self._warm_thread.is_alive():
+            self._warm_again = True  # Picked up when the current warm-up ends
+            return
+        workflows = self._get_selected_workflows()
+        if not workflows:
+            return
+        self._warm_thread = threading.Thread(target=self._warm_up_thread, args=(workflows,),
+                                             daemon=True)
+        self._warm_thread.start()
+
+    def _warm_up_thread(self, workflows):
+        try:
+            import rembg  # noqa: F401
+        except ImportError:
+            return  # Reported when a run starts
+
+        def status(msg):
+            if not self.is_processing:
+                self.root.after(0, lambda: self._set_status(msg))
+
+        start = time.perf_counter()
+        labels = []
+        try:
+            for wf_key in workflows:
+                label = BG_WORKFLOWS[wf_key]["label"]
+                status(f"Loading model: {label}…")
+                warm_up(wf_key)
+                labels.append(label)
+            status(f"AI ready: {', '.join(labels)} ({time.perf_counter() - start:.1f}s)")
+        except Exception as e:
+            status(f"Model warm-up failed: {e}")
+        finally:
+            self.root.after(0, self._warm_up_done)
+
+    def _warm_up_done(self):
+        self._warm_thread = None
+        if self._warm_again:
+            self._warm_again = False
+            self._warm_up_selected()
+
+    def _purge_mask_cache(self):
+        if self.is_processing:
+            messagebox.showwarning("Busy", "Wait for the current run to finish first.")
+            return
+        count, total = _mask_cache.size()
+        if not count:
+            messagebox.showinfo("Mask Cache", "The mask cache is already empty.")
+            return
+        if messagebox.askyesno("Clear Mask Cache",
+                               f"Delete {count} cached masks ({total / 1_048_576:.1f} MB)?\n\n"
+                               "Future runs will re-run the AI models on every image."):
+            count, total = _mask_cache.purge()
+            self._log(f"Cleared mask cache: {count} masks, {total / 1_048_576:.1f} MB freed")
+
+    def _release_models(self):
+        if self.is_processing:
+            messagebox.showwarning("Busy", "Wait for the current run to finish first.")
+            return
+        count = release_sessions()
+        self._log(f"Unloaded {count} AI model{'s' if count != 1 else ''} — "
+                  "they reload on the next run that needs them")
+
     def _log(self, msg):
         self.log_text.configure(state="normal")
         self.log_text.insert("end", msg + "\n")
@@ -733,6 +3540,13 @@ class HeadshotResizerApp:
                 raise ValueError("Custom width and height must be numbers")
         return self.SIZE_PRESETS[self.size_preset.get()]
 
+    def _get_sizes(self):
+        """Return [(subfolder name or None, (width, height)), ...] for this run."""
+        if self.multi_size.get():
+            return [(size_folder_name(label), self.SIZE_PRESETS[label])
+                    for label in self.selected_sizes]
+        return [(None, self._get_dimensions())]
+
     def _get_bg_string(self):
         preset = self.bg_preset.get()
         if preset == "Custom...":
@@ -749,6 +3563,14 @@ class HeadshotResizerApp:
         if not self.output_dir.get():
             messagebox.showerror("Missing Output", "Please select an output folder.")
             return False
+        if self.multi_size.get():
+            # Read the listbox here — the worker thread must not touch widgets
+            self.selected_sizes = [self.size_listbox.get(i)
+                                   for i in self.size_listbox.curselection()]
+            if not self.selected_sizes:
+                messagebox.showerror("No Sizes Selected", "Please select at least one output size.")
+                return False
+            return True
         try:
             w, h = self._get_dimensions()
             if w <= 0 or h <= 0:
@@ -763,9 +3585,25 @@ class HeadshotResizerApp:
             return
         if not self._validate():
             return
+        self._begin_run(self._process_thread)
 
+    def _start_resume(self):
+        if self.is_processing:
+            return
+        if not self.output_dir.get():
+            messagebox.showerror("Missing Output", "Please select the output folder of the run to resume.")
+            return
+        job = resume_job(self.output_dir.get())
+        if job is None:
+            messagebox.showinfo("Nothing to Resume",
+                                "No interrupted run was found in the output folder.")
+            return
+        self._begin_run(self._resume_thread, job)
+
+    def _begin_run(self, target, *args):
         self.is_processing = True
         self.process_btn.configure(state="disabled")
+        self.resume_btn.configure(state="disabled")
         self.progress_var.set(0)
 
         # Clear log
@@ -774,38 +3612,30 @@ class HeadshotResizerApp:
         self.log_text.configure(state="disabled")
 
         # Run processing in background thread
-        thread = threading.Thread(target=self._process_thread, daemon=True)
+        thread = threading.Thread(target=target, args=args, daemon=True)
         thread.start()
 
     def _get_selected_workflows(self):
         """Return list of selected workflow keys."""
-        selected = []
-        if self.wf_portrait.get():
-            selected.append("portrait")
-        if self.wf_general.get():
-            selected.append("general")
-        if self.wf_bria.get():
-            selected.append("bria")
-        return selected
+        return [wf_key for wf_key, var in self.wf_vars.items() if var.get()]
 
     def _process_thread(self):
         try:
             input_path = Path(self.input_dir.get())
             output_base = Path(self.output_dir.get())
 
-            width, height = self._get_dimensions()
+            sizes = self._get_sizes()
             mode = self.crop_mode.get()
             fmt = self.output_format.get()
             quality = self.quality.get()
             do_remove_bg = self.remove_bg.get()
+            use_draft = self.fast_decode.get()
+            use_mask_cache = self.use_mask_cache.get()
+            force = self.force.get()
+            tier = self.speed_tier.get().split()[0].lower()
+            workers = max(1, self.workers.get())
 
             bg_str = self._get_bg_string() if do_remove_bg else "#FFFFFF"
-            bg_spec = parse_bg_spec(bg_str)
-
-            keep_transparent = do_remove_bg and bg_spec['type'] == 'transparent'
-            if keep_transparent and fmt == 'JPEG':
-                fmt = 'PNG'
-                self.root.after(0, lambda: self._log("⚠ JPEG doesn't support transparency. Switched to PNG."))
 
             # Verify rembg is available (installed by launcher)
             if do_remove_bg:
@@ -824,18 +3654,15 @@ class HeadshotResizerApp:
                     self.root.after(0, self._processing_done)
                     return
 
-            images = sorted([
-                f for f in input_path.iterdir()
-                if f.is_file() and f.suffix.lower() in SUPPORTED_EXTENSIONS
-            ])
+            images = ImageScan(input_path, self.recursive.get(),
+                               _split_patterns(self.include_patterns.get()),
+                               _split_patterns(self.exclude_patterns.get()), skip=[output_base])
 
-            if not images:
+            if next(iter(images), None) is None:
                 self.root.after(0, lambda: messagebox.showwarning("No Images", "No supported images found in the input folder."))
                 self.root.after(0, self._processing_done)
                 return
 
-            total = len(images)
-
             # Determine workflow runs
             if do_remove_bg:
                 workflows = self._get_selected_workflows()
@@ -848,122 +3675,65 @@ class HeadshotResizerApp:
             else:
                 workflows = [None]  # Single pass, no bg removal
 
-            total_runs = len(workflows)
-            grand_processed = 0
-            grand_errors = 0
-            output_folders = []
-
-            for run_idx, wf_key in enumerate(workflows):
-                if wf_key:
-                    wf = BG_WORKFLOWS[wf_key]
-                    wf_label = wf["label"]
-                    # Create subfolder per workflow (or direct if only 1 selected)
-                    if total_runs > 1:
-                        output_path = output_base / wf_key
-                    else:
-                        output_path = output_base
-                    self.root.after(0, lambda lab=wf_label, r=run_idx:
-                        self._log(f"\n{'━' * 50}\n🔄 Workflow {r + 1}/{total_runs}: {lab}\n{'━' * 50}"))
-                    self.root.after(0, lambda lab=wf_label:
-                        self._set_status(f"Loading model: {lab}…"))
-                else:
-                    wf_label = "Resize Only"
-                    output_path = output_base
-
-                output_path.mkdir(parents=True, exist_ok=True)
-                output_folders.append(str(output_path))
+            self._run_batch(
+                images, output_base, sizes, workflows, crop_mode=mode, fmt=fmt, quality=quality,
+                bg_str=bg_str, use_draft=use_draft, use_mask_cache=use_mask_cache, tier=tier,
+                workers=workers, force=force)
 
-                bg_label = f" → bg: {bg_str}" if wf_key else ""
-                self.root.after(0, lambda t=total, w=width, h=height, m=mode, f=fmt, bl=bg_label:
-                    self._log(f"Processing {t} images → {w}×{h} ({m} crop, {f}){bl}\n"))
-
-                processed = 0
-                errors = 0
-
-                for i, img_file in enumerate(images):
-                    try:
-                        name = img_file.name
-                        if total_runs > 1:
-                            status = f"[{wf_label}] {i + 1}/{total}: {name}"
-                        else:
-                            status = f"Processing {i + 1}/{total}: {name}"
-                        self.root.after(0, lambda s=status: self._set_status(s))
-
-                        img = Image.open(img_file)
-                        orig_size = f"{img.width}×{img.height}"
-                        img = fix_orientation(img)
-
-                        if wf_key:
-                            img = img.convert("RGBA")
-                            img = remove_background(img, workflow_key=wf_key)
-                            img = composite_on_background(img, bg_spec, width, height, crop_mode=mode)
-                        else:
-                            img = img.convert("RGB")
-                            if mode == "center":
-                                img = crop_center(img, width, height)
-                            elif mode == "top":
-                                img = crop_top(img, width, height)
-                            elif mode == "fill":
-                                img = fill_resize(img, width, height, bg_spec=bg_spec)
-
-                        # Convert for save
-                        if fmt == "JPEG" and img.mode != "RGB":
-                            img = img.convert("RGB")
-
-                        ext = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}[fmt]
-                        out_name = img_file.stem + ext
-                        save_params = {}
-                        if fmt == "JPEG":
-                            save_params = {"quality": quality, "optimize": True}
-                        elif fmt == "WEBP":
-                            save_params = {"quality": quality}
-                        elif fmt == "PNG":
-                            save_params = {"optimize": True}
-
-                        img.save(output_path / out_name, format=fmt, **save_params)
-                        processed += 1
-
-                        self.root.after(0, lambda n=name, s=orig_size, idx=i:
-                            self._log(f"  ✓ [{idx + 1}/{total}] {n} ({s})"))
-
-                    except Exception as e:
-                        errors += 1
-                        self.root.after(0, lambda n=img_file.name, err=str(e), idx=i:
-                            self._log(f"  ✗ [{idx + 1}/{total}] {n}: {err}"))
-
-                    # Update progress — spans across all workflows
-                    overall = ((run_idx * total) + (i + 1)) / (total_runs * total) * 100
-                    self.root.after(0, lambda p=overall: self.progress_var.set(p))
-
-                grand_processed += processed
-                grand_errors += errors
-
-                self.root.after(0, lambda p=processed, e=errors, lab=wf_label:
-                    self._log(f"\n  ✅ {lab}: {p} processed, {e} errors"))
-
-            # Final summary
-            if total_runs > 1:
-                self.root.after(0, lambda: self._log(
-                    f"\n{'━' * 50}\n📊 All workflows complete: "
-                    f"{grand_processed} total processed, {grand_errors} total errors\n"
-                    f"Output folders: {', '.join(output_folders)}"))
-
-            self.root.after(0, lambda gp=grand_processed:
-                self._set_status(f"Complete — {gp} images processed"))
-
-            # Open output folder (base folder so user can see all subfolders)
-            self.root.after(0, lambda: self._ask_open_folder(str(output_base)))
+        except Exception as e:
+            self._report_error(e)
+        finally:
+            self.root.after(0, self._processing_done)
 
+    def _resume_thread(self, job):
+        try:
+            if any(job["workflows"]):
+                try:
+                    import rembg  # noqa: F401
+                except ImportError:
+                    raise RuntimeError("rembg is not installed — re-launch with the platform "
+                                       "launcher to install it, then resume.")
+            self._run_batch(**job, resume=True)
         except Exception as e:
-            self.root.after(0, lambda: self._log(f"\n❌ Error: {e}"))
-            self.root.after(0, lambda: self._set_status("Error — see log"))
-            self.root.after(0, lambda: messagebox.showerror("Processing Error", str(e)))
+            self._report_error(e)
         finally:
             self.root.after(0, self._processing_done)
 
+    def _run_batch(self, images, output_base, *args, **kwargs):
+        """run_batch() with the log, status bar and progress bar wired up."""
+        summary = run_batch(
+            images, output_base, *args, **kwargs,
+            log=lambda m: self.root.after(0, lambda m=m: self._log(m)),
+            status=lambda m: self.root.after(0, lambda m=m: self._set_status(m)),
+            progress=lambda p: self.root.after(0, lambda p=p: self._set_progress(p)))
+        skipped = f", {summary['skipped']} unchanged skipped" if summary["skipped"] else ""
+        resumed = f", {summary['resumed']} finished before" if summary["resumed"] else ""
+        self.root.after(0, lambda gp=summary["processed"]:
+            self._set_status(f"Complete — {gp} images processed{skipped}{resumed}"))
+
+        # Open output folder (base folder so user can see all subfolders)
+        self.root.after(0, lambda: self._ask_open_folder(str(output_base)))
+
+    def _set_progress(self, percent):
+        """Show percent done, or an indeterminate bar for None (total not yet known)."""
+        if percent is None:
+            self.progress_bar.configure(mode="indeterminate")
+            self.progress_bar.start(15)
+            return
+        if str(self.progress_bar.cget("mode")) == "indeterminate":
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+        self.progress_var.set(percent)
+
+    def _report_error(self, e):
+        self.root.after(0, lambda: self._log(f"\n❌ Error: {e}"))
+        self.root.after(0, lambda: self._set_status("Error — see log"))
+        self.root.after(0, lambda: messagebox.showerror("Processing Error", str(e)))
+
     def _processing_done(self):
         self.is_processing = False
         self.process_btn.configure(state="normal")
+        self.resume_btn.configure(state="normal")
 
     def _ask_open_folder(self, path):
         if messagebox.askyesno("Complete", f"Processing complete!\n\nOpen output folder?"):
@@ -979,7 +3749,332 @@ class HeadshotResizerApp:
 # Entry point
 # ---------------------------------------------------------------------------
 
-def main():
+# Command-line exit codes
+EXIT_OK = 0        # every output was written
+EXIT_PARTIAL = 1   # some images or outputs failed, the rest were written
+EXIT_USAGE = 2     # invalid arguments (argparse exits with 2 as well)
+EXIT_FAILED = 3    # nothing could be processed: missing folder, dependency or images
+
+
+def _parse_size(text):
+    match = re.fullmatch(r"\s*(\d+)\s*[x×X]\s*(\d+)\s*", text)
+    if not match or not all(int(v) > 0 for v in match.groups()):
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _find_preset(name, presets):
+    """Preset label matching name in full, after the dash or without its "(...)" note, ignoring case."""
+    name = name.strip().lower()
+    for label in presets:
+        short = label.split("—")[-1].strip().lower()
+        if label != "Custom..." and name in (label.lower(), short, re.sub(r"\s*\(.*\)$", "", short)):
+            return label
+    return None
+
+
+def _cli_sizes(args, parser):
+    """[(subfolder or None, (w, h)), ...] from --size and --preset."""
+    sizes = []
+    for name in args.preset or []:
+        label = _find_preset(name, HeadshotResizerApp.SIZE_PRESETS)
+        if label is None:
+            parser.error(f"unknown size preset: {name!r}")
+        sizes.append((size_folder_name(label), HeadshotResizerApp.SIZE_PRESETS[label]))
+    sizes += [(f"{w}x{h}", (w, h)) for w, h in args.size or []]
+    if not sizes:
+        sizes = [(None, (500, 500))]
+    if len(sizes) == 1:
+        sizes = [(None, sizes[0][1])]
+    return sizes
+
+
+def _print_json(status, code, **info):
+    print(json.dumps({"status": status, "exit_code": code, **info}, ensure_ascii=False), flush=True)
+    return code
+
+
+def _summary_status(summary):
+    """(status, exit code) for a run_batch summary."""
+    if not summary["errors"]:
+        return "ok", EXIT_OK
+    if summary["processed"] or summary["skipped"] or summary["resumed"]:
+        return "partial", EXIT_PARTIAL
+    return "failed", EXIT_FAILED
+
+
+def _apply_performance_flags(args, workflow_keys):
+    if args.batch_size is not None:
+        for wf_key in workflow_keys:
+            BG_WORKFLOWS[wf_key]["batch_size"] = args.batch_size
+    if args.threads:
+        SESSION_OVERRIDES.update(intra_op_num_threads=args.threads, inter_op_num_threads=1)
+
+
+def _stop_on_signals():
+    """An Event set by SIGINT or SIGTERM, so long-running modes can finish cleanly."""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    return stop
+
+
+def run_cli(args, parser):
+    """Headless batch run. Prints a JSON summary on stdout and returns an exit code."""
+    log = (lambda m: None) if args.quiet else (lambda m: print(m, file=sys.stderr, flush=True))
+    sizes = _cli_sizes(args, parser)
+    bg_label = _find_preset(args.bg, HeadshotResizerApp.BG_PRESETS)
+    bg_str = HeadshotResizerApp.BG_PRESETS[bg_label] if bg_label else args.bg
+    workflows = args.workflow or [None]
+    if args.bg != parser.get_default("bg") and not args.workflow and args.crop != "fill":
+        log(f"⚠ --bg is only used with --workflow or --crop fill — ignoring {args.bg}")
+
+    input_dir = Path(args.input)
+    if not input_dir.is_dir():
+        return _print_json("failed", EXIT_FAILED, error=f"Input folder not found: {input_dir}")
+    if any(workflows):
+        try:
+            import rembg  # noqa: F401
+        except ImportError:
+            return _print_json("failed", EXIT_FAILED,
+                               error="rembg is not installed; --workflow needs it (pip install rembg)")
+    _apply_performance_flags(args, filter(None, workflows))
+
+    def run(images):
+        workers = args.workers
+        if args.watch and len(images) < WATCH_POOL_MIN_IMAGES:
+            workers = 1
+        return run_batch(
+            images, args.output, sizes, workflows, crop_mode=args.crop, fmt=args.format,
+            quality=args.quality, bg_str=bg_str, use_draft=not args.no_draft,
+            use_mask_cache=not args.no_mask_cache, tier=args.tier, workers=workers,
+            force=args.force, log=log)
+
+    if args.watch:
+        return watch_cli(input_dir, run, workflows, args, log)
+
+    images = ImageScan(input_dir, args.recursive, args.include or [], args.exclude or [],
+                       skip=[args.output])
+    if next(iter(images), None) is None:
+        return _print_json("failed", EXIT_FAILED, error=f"No supported images in {input_dir}")
+    start = time.perf_counter()
+    try:
+        summary = run(images)
+    except Exception as e:
+        return _print_json("failed", EXIT_FAILED, error=str(e))
+    return _print_json(*_summary_status(summary),
+                       seconds=round(time.perf_counter() - start, 3), **summary)
+
+
+def resume_cli(args, parser):
+    """Finish the interrupted run in --output with its original settings."""
+    log = (lambda m: None) if args.quiet else (lambda m: print(m, file=sys.stderr, flush=True))
+    if not args.output:
+        parser.error("--resume needs --output, the folder of the interrupted run")
+    job = resume_job(args.output)
+    if job is None:
+        return _print_json("failed", EXIT_FAILED,
+                           error=f"No interrupted run to resume in {args.output}")
+    workflows = [wf_key for wf_key in job["workflows"] if wf_key]
+    if workflows:
+        try:
+            import rembg  # noqa: F401
+        except ImportError:
+            return _print_json("failed", EXIT_FAILED,
+                               error="rembg is not installed; the run to resume needs it")
+    _apply_performance_flags(args, workflows)
+    start = time.perf_counter()
+    try:
+        summary = run_batch(**job, resume=True, log=log)
+    except Exception as e:
+        return _print_json("failed", EXIT_FAILED, error=str(e))
+    return _print_json(*_summary_status(summary),
+                       seconds=round(time.perf_counter() - start, 3), **summary)
+
+
+def watch_cli(input_dir, run, workflows, args, log):
+    """Process arrivals in input_dir with run(images) until SIGINT/SIGTERM.
+
+    Models are loaded and warmed once up front and stay in the session pool,
+    so each arrival costs only its own inference. One JSON line per batch of
+    arrivals goes to stdout.
+    """
+    watcher = FolderWatcher(input_dir, settle=args.settle, include_existing=not args.new_only)
+    stop = _stop_on_signals()
+
+    for wf_key in filter(None, workflows):
+        log(f"Loading model: {BG_WORKFLOWS[wf_key]['label']}…")
+        warm_up(wf_key)
+    log(f"👀 Watching {input_dir} ({watcher.mode}, {args.settle:g}s settle) — Ctrl+C to stop\n")
+
+    try:
+        for images, first_seen in watcher.batches(stop):
+            try:
+                summary = run(images)
+            except Exception as e:
+                log(f"❌ {e}")
+                _print_json("failed", EXIT_FAILED, error=str(e), files=[str(p) for p in images])
+                continue
+            latency = time.monotonic() - first_seen
+            log(f"⏱ {len(images)} new image{'s' if len(images) != 1 else ''}, "
+                f"written {latency:.1f}s after arrival\n")
+            _print_json(*_summary_status(summary), latency=round(latency, 3), **summary)
+    finally:
+        watcher.close()
+    log("Stopped watching.")
+    return EXIT_OK
+
+
+def serve_cli(args, parser):
+    """Run the HTTP service until SIGINT/SIGTERM."""
+    log = (lambda m: None) if args.quiet else (lambda m: print(m, file=sys.stderr, flush=True))
+    host, _, port = args.serve.rpartition(":")
+    if not port.isdigit():
+        parser.error(f"--serve: expected [HOST:]PORT, got {args.serve!r}")
+    workflows = args.workflow or []
+    _apply_performance_flags(args, workflows or BG_WORKFLOWS)
+    try:
+        service = ResizerService(host or SERVE_HOST, int(port), args.max_concurrent,
+                                 use_draft=not args.no_draft,
+                                 use_mask_cache=not args.no_mask_cache, log=log)
+    except OSError as e:
+        print(f"Cannot listen on {args.serve}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    try:
+        import rembg  # noqa: F401 — imported here, not first on a request thread
+    except ImportError:
+        service.ai_available = False
+        log("⚠ rembg is not installed — /cutout is unavailable, /resize works")
+    for wf_key in workflows if service.ai_available else []:
+        log(f"Loading model: {BG_WORKFLOWS[wf_key]['label']}…")
+        warm_up(wf_key)
+
+    stop = _stop_on_signals()
+    threading.Thread(target=service.serve_forever, name="http", daemon=True).start()
+    log(f"🌐 Serving on {service.address} — POST /resize or /cutout, GET /metrics; Ctrl+C to stop")
+    stop.wait()
+    service.shutdown()
+    log("Stopped serving.")
+    return EXIT_OK
+
+
+def main(argv=None):
+    workflows = available_workflows()
+    parser = argparse.ArgumentParser(
+        description="Digital Harmony Group Graphics Resizer. Run without arguments to open the app.",
+        epilog="Batch example: %(prog)s --input photos --output out --size 500x500 --crop top "
+               "--format WEBP --workflow portrait --bg \"#663399:#F77E2D:radial\". "
+               "Prints a JSON summary; exit code 0 = all written, 1 = some failed, "
+               "2 = bad arguments, 3 = nothing processed.")
+    batch = parser.add_argument_group("headless batch processing")
+    batch.add_argument("--input", "-i", metavar="DIR", help="folder of images to process")
+    batch.add_argument("--output", "-o", metavar="DIR", help="folder to write results to")
+    batch.add_argument("--recursive", "-r", action="store_true",
+                       help="also process subfolders of --input, mirroring them under --output")
+    batch.add_argument("--include", action="append", metavar="GLOB",
+                       help="only process files whose path under --input or name matches; repeatable")
+    batch.add_argument("--exclude", action="append", metavar="GLOB",
+                       help="skip files and subfolders whose path or name matches; repeatable")
+    batch.add_argument("--size", action="append", type=_parse_size, metavar="WxH",
+                       help="output size; repeat for several (one subfolder each). Default 500x500")
+    batch.add_argument("--preset", action="append", metavar="NAME",
+                       help="output size by preset name, e.g. 'LinkedIn Profile'; repeatable")
+    batch.add_argument("--crop", choices=["top", "center", "fill"], default="top")
+    batch.add_argument("--format", type=str.upper, choices=list(OUTPUT_EXTENSIONS), default="JPEG")
+    batch.add_argument("--quality", type=int, default=95, metavar="1-100")
+    batch.add_argument("--workflow", action="append", choices=workflows,
+                       help="remove the background with this AI workflow; repeat to compare")
+    batch.add_argument("--bg", default="#FFFFFF", metavar="SPEC",
+                       help="background behind --workflow cutouts and around --crop fill padding: "
+                            "hex colour, gradient (#A:#B[:right|diagonal|radial]), TRANSPARENT, "
+                            "an image file or a preset name. Default #FFFFFF")
+    batch.add_argument("--tier", choices=["auto"] + list(SPEED_TIERS), default="auto",
+                       help="AI inference resolution (default: auto, by output size)")
+    batch.add_argument("--workers", type=int, default=DEFAULT_WORKERS, metavar="N",
+                       help=f"worker processes for resize-only runs (default {DEFAULT_WORKERS})")
+    batch.add_argument("--batch-size", type=int, metavar="N",
+                       help="images per AI model run (default: each workflow's batch_size)")
+    batch.add_argument("--threads", type=int, metavar="N",
+                       help="onnxruntime intra-op threads (default: config or onnxruntime's choice)")
+    batch.add_argument("--no-draft", action="store_true",
+                       help="decode JPEGs at full resolution instead of draft scale")
+    batch.add_argument("--no-mask-cache", action="store_true",
+                       help="always run the AI model instead of reusing cached masks")
+    batch.add_argument("--force", action="store_true",
+                       help=f"reprocess images the output folder's {MANIFEST_NAME} shows as up to date")
+    batch.add_argument("--resume", action="store_true",
+                       help="finish the run that was interrupted in --output, with its original "
+                            "inputs and settings (other batch options are ignored)")
+    batch.add_argument("--quiet", "-q", action="store_true", help="no progress log on stderr")
+    batch.add_argument("--watch", action="store_true",
+                       help="keep running: process images as they arrive in --input, one JSON line "
+                            "per batch, until Ctrl+C or SIGTERM")
+    batch.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS, metavar="SECONDS",
+                       help=f"--watch: how long a file must stop changing before it is processed "
+                            f"(default {WATCH_SETTLE_SECONDS:g}; files closed by a local writer go at once)")
+    batch.add_argument("--new-only", action="store_true",
+                       help="--watch: skip images already in the folder at start-up")
+    serve = parser.add_argument_group(
+        "HTTP service",
+        "POST an image to /resize or /cutout?size=WxH&crop=&format=&quality=&bg=&workflow=&tier= "
+        "to get the result back; GET /metrics for Prometheus counters. --workflow models are "
+        "loaded at start-up; --threads, --batch-size, --no-draft and --no-mask-cache apply too.")
+    serve.add_argument("--serve", nargs="?", const=f"{SERVE_HOST}:{SERVE_PORT}", metavar="[HOST:]PORT",
+                       help=f"run the HTTP service (default {SERVE_HOST}:{SERVE_PORT})")
+    serve.add_argument("--max-concurrent", type=int, default=SERVE_MAX_CONCURRENT, metavar="N",
+                       help=f"requests processed at once; more wait, then get 503 "
+                            f"(default {SERVE_MAX_CONCURRENT})")
+    parser.add_argument("--purge-mask-cache", action="store_true",
+                        help="delete every cached AI mask and exit")
+    parser.add_argument("--autotune-threads", metavar="WORKFLOW", nargs="+",
+                        choices=sorted(workflows),
+                        help="time each workflow's model at several thread counts, save the "
+                             "fastest to the onnxruntime config and exit")
+    parser.add_argument("--max-threads", type=int, metavar="N",
+                        help="highest thread count --autotune-threads may pick "
+                             "(default: all CPUs; lower it on shared machines)")
+    args = parser.parse_args(argv)
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    if args.serve:
+        return serve_cli(args, parser)
+
+    if args.resume:
+        return resume_cli(args, parser)
+
+    if args.input or args.output:
+        if not (args.input and args.output):
+            parser.error("--input and --output are both required for a batch run")
+        if not 1 <= args.quality <= 100:
+            parser.error("--quality must be between 1 and 100")
+        if args.watch and (args.recursive or args.include or args.exclude):
+            parser.error("--watch only watches the top level of --input; "
+                         "--recursive, --include and --exclude are for batch runs")
+        return run_cli(args, parser)
+
+    if args.autotune_threads:
+        config = load_session_config()
+        for wf_key in args.autotune_threads:
+            print(f"{BG_WORKFLOWS[wf_key]['label']}:")
+            (threads, rate), *_ = autotune_threads(wf_key, max_threads=args.max_threads)
+            print(f"  → {threads} threads ({rate:.2f} images/sec)")
+            wf_config = config.setdefault("workflows", {}).setdefault(wf_key, {})
+            wf_config.setdefault("session_options", {}).update(
+                intra_op_num_threads=threads, inter_op_num_threads=1)
+        save_session_config(config)
+        print(f"Saved to {session_config_path()}")
+        return EXIT_OK
+
+    if args.purge_mask_cache:
+        count, total = _mask_cache.purge()
+        print(f"Cleared mask cache: {count} masks, {total / 1_048_576:.1f} MB freed ({_mask_cache.root})")
+        return EXIT_OK
+
+    if tk is None:
+        _tkinter_missing()
+        return EXIT_FAILED
+
     root = tk.Tk()
 
     # macOS: bring window to front
@@ -993,7 +4088,8 @@ def main():
 
     app = HeadshotResizerApp(root)
     root.mainloop()
+    return EXIT_OK
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
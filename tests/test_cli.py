@@ -0,0 +1,66 @@
+"""Headless command line: argument checks, JSON summary and exit codes."""
+
+import json
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+@pytest.fixture
+def photos(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    for i in range(3):
+        Image.new("RGB", (400, 600), (60 * i, 100, 150)).save(folder / f"p{i}.jpg")
+    return folder
+
+
+def run(capsys, *argv):
+    code = engine.main(["--quiet", *map(str, argv)])
+    return code, json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+
+
+def test_batch_run(photos, tmp_path, capsys):
+    code, summary = run(capsys, "-i", photos, "-o", tmp_path / "out", "--size", "100x150")
+    assert code == engine.EXIT_OK
+    assert summary["status"] == "ok" and summary["images"] == 3 and summary["processed"] == 3
+    assert Image.open(tmp_path / "out" / "p0.jpg").size == (100, 150)
+
+
+def test_failed_image_is_partial(photos, tmp_path, capsys):
+    (photos / "bad.jpg").write_bytes(b"not an image")
+    code, summary = run(capsys, "-i", photos, "-o", tmp_path / "out")
+    assert code == engine.EXIT_PARTIAL
+    assert summary["images"] == 4 and summary["errors"] == 1
+
+
+def test_missing_input_fails(tmp_path, capsys):
+    code, summary = run(capsys, "-i", tmp_path / "nowhere", "-o", tmp_path / "out")
+    assert code == engine.EXIT_FAILED
+
+
+@pytest.mark.parametrize("argv", [
+    ["--quality", "0"],
+    ["--batch-size", "0"],
+    ["--batch-size", "-2"],
+    ["--size", "100"],
+])
+def test_bad_arguments_exit_2(photos, tmp_path, argv):
+    with pytest.raises(SystemExit) as e:
+        engine.main(["-i", str(photos), "-o", str(tmp_path / "out"), *argv])
+    assert e.value.code == engine.EXIT_USAGE
+
+
+def test_fill_pads_with_bg_without_a_workflow(photos, tmp_path, capsys):
+    code, _ = run(capsys, "-i", photos, "-o", tmp_path / "out", "--size", "300x300",
+                  "--crop", "fill", "--bg", "#000000")
+    assert code == engine.EXIT_OK
+    # 400×600 fitted into 300×300 leaves black bars left and right
+    assert Image.open(tmp_path / "out" / "p0.jpg").getpixel((5, 150)) == (0, 0, 0)
+
+
+def test_unused_bg_is_reported(photos, tmp_path, capsys):
+    engine.main(["-i", str(photos), "-o", str(tmp_path / "out"), "--bg", "#000000"])
+    assert "--bg is only used with" in capsys.readouterr().err
@@ -0,0 +1,58 @@
+"""composite_masked against the full-resolution cutout it replaces."""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+import batch_resize_headshots as engine
+
+pytest.importorskip("rembg")
+WHITE = engine.parse_bg_spec("#FFFFFF")
+
+
+@pytest.fixture(scope="module")
+def photo(tmp_path_factory):
+    """A 3072 px JPEG (draft-decodable) and a soft 1024 px model-style mask."""
+    path = tmp_path_factory.mktemp("composite") / "big.jpg"
+    img = Image.new("RGB", (3072, 3072), (40, 110, 170))
+    ImageDraw.Draw(img).ellipse((675, 450, 2400, 3000), fill=(220, 180, 150))
+    img.save(path, quality=95)
+    mask = Image.new("L", (1024, 1024))
+    ImageDraw.Draw(mask).ellipse((225, 150, 800, 1000), fill=255)
+    return path, mask.filter(ImageFilter.GaussianBlur(2))
+
+
+def diff(a, b):
+    d = np.abs(np.asarray(a.convert("RGB"), np.int16) - np.asarray(b.convert("RGB"), np.int16))
+    return d.mean(), d.max()
+
+
+@pytest.mark.parametrize("side", [768, 400, 200])
+def test_matches_full_resolution_cutout(photo, side):
+    path, mask = photo
+    full, _ = engine.prepare_image(path, side, side, "top", use_draft=False, for_ai=True)
+    cutout = engine.remove_background(full, "portrait", mask)
+    expected = engine.composite_on_background(cutout, WHITE, side, side, "top")
+    img, _ = engine.prepare_image(path, side, side, "top", for_ai=True)
+    mean, peak = diff(engine.composite_masked(img, mask, "portrait", WHITE, side, side), expected)
+    assert mean < 0.25 and peak <= 43  # Differences are confined to the subject's edge
+
+
+@pytest.mark.parametrize("side", [400, 200])
+def test_draft_decode_keeps_the_edge_blur(photo, side):
+    # The blur radius follows the source's width, not the draft-decoded one
+    path, mask = photo
+    draft, _ = engine.prepare_image(path, side, side, "top", for_ai=True)
+    full, _ = engine.prepare_image(path, side, side, "top", use_draft=False, for_ai=True)
+    assert draft.width < full.width
+    mean, peak = diff(engine.composite_masked(draft, mask, "portrait", WHITE, side, side),
+                      engine.composite_masked(full, mask, "portrait", WHITE, side, side))
+    assert mean < 0.01 and peak <= 5
+
+
+def test_source_width_is_upright(tmp_path):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90° clockwise
+    Image.new("RGB", (400, 200)).save(tmp_path / "turned.jpg", exif=exif)
+    img, _ = engine.prepare_image(tmp_path / "turned.jpg", 100, 100, "top")
+    assert img.size == (200, 400) and img.info["source_width"] == 200
@@ -0,0 +1,32 @@
+"""crop_top / crop_center on sizes where float error hits the scaled side."""
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+@pytest.mark.parametrize("crop", [engine.crop_top, engine.crop_center])
+@pytest.mark.parametrize("source, target", [
+    ((1365, 2048), (500, 500)),
+    ((333, 777), (500, 500)),
+    ((2048, 1365), (500, 500)),
+    ((1000, 1499), (300, 450)),
+    ((4000, 3000), (728, 90)),
+])
+def test_crop_exact_size(crop, source, target):
+    img = Image.new("RGB", source, (120, 80, 40))
+    out = crop(img, *target)
+    assert out.size == target
+    assert out.getpixel((0, 0)) == (120, 80, 40)
+
+
+def test_off_by_one_ratios_never_short():
+    # Widths where int(width * ratio) rounds down below the target
+    short = [(w, h) for w in range(300, 1400) for h in (w * 3 // 2, w * 2)
+             if int(w * max(500 / w, 500 / h)) < 500]
+    assert short
+    for size in short:
+        img = Image.new("L", size)
+        assert engine.crop_top(img, 500, 500).size == (500, 500)
+        assert engine.crop_center(img, 500, 500).size == (500, 500)
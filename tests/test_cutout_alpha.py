@@ -0,0 +1,30 @@
+"""AI cutouts keep the transparency the input already had."""
+
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+def half_transparent(path):
+    img = Image.new("RGBA", (400, 400), (200, 50, 50, 255))
+    img.paste((200, 50, 50, 0), (0, 0, 200, 400))  # Left half fully transparent
+    img.save(path)
+    return path
+
+
+def test_prepare_keeps_alpha_for_ai_only(tmp_path):
+    path = half_transparent(tmp_path / "in.png")
+    assert engine.prepare_image(path, 200, 200, "top", for_ai=True)[0].mode == "RGBA"
+    assert engine.prepare_image(path, 200, 200, "top")[0].mode == "RGB"
+    Image.new("RGB", (40, 40)).save(tmp_path / "opaque.jpg")
+    assert engine.prepare_image(tmp_path / "opaque.jpg", 20, 20, "top", for_ai=True)[0].mode == "RGB"
+
+
+def test_input_alpha_is_merged_into_the_mask(tmp_path):
+    img, _ = engine.prepare_image(half_transparent(tmp_path / "in.png"), 200, 200, "top",
+                                  for_ai=True)
+    mask = Image.new("L", img.size, 255)  # The model keeps everything
+    out = engine.composite_masked(img, mask, "portrait", engine.parse_bg_spec("TRANSPARENT"),
+                                  200, 200, "top")
+    assert out.getpixel((20, 100))[3] == 0
+    assert out.getpixel((180, 100))[3] == 255
@@ -0,0 +1,59 @@
+"""Reduced-scale JPEG decoding: the planner and its effect on decodes."""
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+@pytest.mark.parametrize("crop_mode", ["top", "center", "fill"])
+def test_draft_leaves_margin(crop_mode):
+    size = engine.plan_draft_size((4000, 6000), 500, 500, crop_mode)
+    assert size is not None
+    ratio = (min if crop_mode == "fill" else max)(500 / 4000, 500 / 6000)
+    assert size[0] >= 4000 * ratio * engine.DRAFT_MARGIN
+    assert size[1] >= 6000 * ratio * engine.DRAFT_MARGIN
+
+
+def test_no_draft_when_target_is_close_to_source():
+    assert engine.plan_draft_size((1200, 1800), 500, 750) is None
+
+
+def test_rotated_source_swaps_sides():
+    # Stored landscape, displayed portrait (EXIF orientation 6)
+    upright = engine.plan_draft_size((4000, 6000), 300, 300)
+    rotated = engine.plan_draft_size((6000, 4000), 300, 300, orientation=6)
+    assert rotated == (upright[1], upright[0])
+
+
+def test_min_side_keeps_ai_resolution():
+    size = engine.plan_draft_size((4000, 6000), 100, 100, min_side=1024)
+    assert size is None or min(size) >= 1024
+
+
+@pytest.fixture
+def large_jpeg(tmp_path):
+    path = tmp_path / "big.jpg"
+    Image.new("RGB", (4000, 6000), (90, 140, 200)).save(path, quality=90)
+    return path
+
+
+def test_prepare_image_decodes_at_reduced_scale(large_jpeg):
+    img, orig_size = engine.prepare_image(large_jpeg, 300, 300, "top")
+    assert orig_size == "4000×6000"
+    assert img.width < 4000 and img.width >= 300 * engine.DRAFT_MARGIN
+    full, _ = engine.prepare_image(large_jpeg, 300, 300, "top", use_draft=False)
+    assert full.size == (4000, 6000)
+
+
+def test_draft_output_matches_full_decode(large_jpeg):
+    draft = engine.crop_top(engine.prepare_image(large_jpeg, 300, 300, "top")[0], 300, 300)
+    full = engine.crop_top(engine.prepare_image(large_jpeg, 300, 300, "top", False)[0], 300, 300)
+    assert all(abs(a - b) <= 3 for a, b in zip(draft.getpixel((150, 150)), full.getpixel((150, 150))))
+
+
+def test_png_is_never_drafted(tmp_path):
+    path = tmp_path / "big.png"
+    Image.new("RGB", (3000, 3000)).save(path)
+    with Image.open(path) as img:
+        assert not engine.apply_draft(img, 100, 100)
@@ -0,0 +1,36 @@
+"""INT8 "fast" workflows are offered only once their quantized model exists."""
+
+import pytest
+
+import batch_resize_headshots as engine
+
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    files = {}
+    for name in ("birefnet-portrait", "birefnet-general", "bria-rmbg"):
+        files[name] = tmp_path / f"{name}.onnx"
+        files[name].write_bytes(b"model")
+    monkeypatch.setattr(engine, "_local_model_file", files.get)
+    return files
+
+
+def test_fast_workflows_need_their_int8_model(models):
+    plain = [k for k, wf in engine.BG_WORKFLOWS.items() if not wf.get("quantized")]
+    assert engine.available_workflows() == plain
+    engine.quantized_model_path(models["bria-rmbg"]).write_bytes(b"int8")
+    assert engine.available_workflows() == plain + ["bria_fast"]
+
+
+def test_missing_model_hides_fast_workflow(models):
+    engine.quantized_model_path(models["bria-rmbg"]).write_bytes(b"int8")
+    del models["bria-rmbg"]
+    assert "bria_fast" not in engine.available_workflows()
+
+
+def test_cli_rejects_unavailable_fast_workflow(models, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        engine.main(["--input", str(tmp_path), "--output", str(tmp_path / "out"),
+                     "--workflow", "bria_fast"])
+    assert exc.value.code == engine.EXIT_USAGE
+    assert "invalid choice: 'bria_fast'" in capsys.readouterr().err
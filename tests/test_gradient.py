@@ -0,0 +1,31 @@
+"""The numpy gradient renderer against the per-pixel reference, within ±1."""
+
+import pytest
+from PIL import ImageChops
+
+import batch_resize_headshots as engine
+
+pytest.importorskip("numpy")
+
+STOPS = {
+    1: [(102, 51, 153)],
+    2: [(102, 51, 153), (247, 126, 45)],
+    5: [(0, 0, 0), (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)],
+}
+
+
+@pytest.mark.parametrize("direction", sorted(engine.GRADIENT_DIRECTIONS))
+@pytest.mark.parametrize("stops", sorted(STOPS))
+@pytest.mark.parametrize("size", [(1, 1), (1, 57), (57, 1), (64, 48), (31, 97)])
+def test_matches_reference(direction, stops, size):
+    colors = STOPS[stops]
+    fast = engine.create_gradient(*size, colors, direction)
+    reference = engine._create_gradient_python(*size, colors, direction)
+    assert fast.size == reference.size == size
+    worst = max(hi for _, hi in ImageChops.difference(fast, reference).getextrema())
+    assert worst <= 1
+
+
+def test_requested_mode():
+    img = engine.create_gradient(20, 10, STOPS[2], "radial", mode="RGBA")
+    assert img.mode == "RGBA" and img.getpixel((0, 0))[3] == 255
@@ -0,0 +1,123 @@
+"""RunManifest: which inputs an incremental run may skip."""
+
+import os
+
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+def make_photos(folder, n=3):
+    folder.mkdir()
+    for i in range(n):
+        Image.new("RGB", (600, 900), (40 * i, 90, 160)).save(folder / f"p{i}.jpg")
+    return engine.find_images(folder)
+
+
+def run(images, out, **kw):
+    return engine.run_batch(images, out, [(None, (200, 200))], [None], log=lambda m: None, **kw)
+
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    assert run(images, out)["processed"] == 3
+    summary = run(images, out)
+    assert summary["skipped"] == 3 and summary["processed"] == 0
+    assert run(images, out, force=True)["processed"] == 3
+
+
+def test_changed_input_is_rendered_again(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out)
+    Image.new("RGB", (600, 900), "red").save(images[1])
+    summary = run(images, out)
+    assert summary["processed"] == 1 and summary["skipped"] == 2
+
+
+def test_missing_output_is_rendered_again(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out)
+    (out / "p0.jpg").unlink()
+    assert run(images, out)["processed"] == 1
+
+
+def test_returning_to_earlier_settings_rerenders(tmp_path):
+    # q95 and q80 write the same files, so after q80 the q95 outputs are gone
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    assert run(images, out, quality=95)["processed"] == 3
+    assert run(images, out, quality=80)["processed"] == 3
+    assert run(images, out, quality=95)["processed"] == 3
+    assert run(images, out, quality=95)["skipped"] == 3
+
+
+def test_fast_decode_toggle_rerenders(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out, use_draft=True)
+    assert run(images, out, use_draft=False)["processed"] == 3
+    assert run(images, out, use_draft=True)["processed"] == 3
+
+
+def test_targets_in_other_folders_are_kept(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    small, large = [("small", (100, 100))], [("large", (300, 300))]
+    engine.run_batch(images, out, small, [None], log=lambda m: None)
+    engine.run_batch(images, out, large, [None], log=lambda m: None)
+    summary = engine.run_batch(images, out, small + large, [None], log=lambda m: None)
+    assert summary["skipped"] == 3
+
+
+def test_touched_but_unchanged_input_is_skipped(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out)
+    stat = images[0].stat()
+    os.utime(images[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert run(images, out)["skipped"] == 3
+    # The new mtime was remembered, so the next check needs no hashing
+    entry = engine.RunManifest(out).inputs[str(images[0])]
+    assert entry["mtime_ns"] == images[0].stat().st_mtime_ns
+
+
+def test_unreadable_manifest_means_a_full_run(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out)
+    (out / engine.MANIFEST_NAME).write_text("{not json", encoding="utf-8")
+    assert run(images, out)["processed"] == 3
+    assert run(images, out)["skipped"] == 3
+
+
+def test_other_output_settings_are_not_skipped(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out)
+    assert run(images, out, fmt="PNG")["processed"] == 3
+    assert run(images, out, crop_mode="center")["processed"] == 3
+
+
+def test_bg_is_keyed_only_where_it_is_rendered(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    run(images, out, bg_str="#000000")
+    # Top crop shows no background, so another one changes nothing
+    assert run(images, out, bg_str="#FF0000")["skipped"] == 3
+    run(images, out, crop_mode="fill", bg_str="#000000")
+    assert run(images, out, crop_mode="fill", bg_str="#000000")["skipped"] == 3
+    assert run(images, out, crop_mode="fill", bg_str="#FF0000")["processed"] == 3
+
+
+def test_edited_backdrop_image_rerenders(tmp_path):
+    images = make_photos(tmp_path / "in")
+    out = tmp_path / "out"
+    backdrop = tmp_path / "backdrop.png"
+    Image.new("RGB", (50, 50), "navy").save(backdrop)
+    run(images, out, crop_mode="fill", bg_str=str(backdrop))
+    assert run(images, out, crop_mode="fill", bg_str=str(backdrop))["skipped"] == 3
+    Image.new("RGB", (60, 60), "olive").save(backdrop)
+    assert run(images, out, crop_mode="fill", bg_str=str(backdrop))["processed"] == 3
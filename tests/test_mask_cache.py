@@ -0,0 +1,77 @@
+"""MaskCache: keys, the on-disk round trip, eviction and purging."""
+
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+@pytest.fixture(autouse=True)
+def sides(monkeypatch):
+    # A dynamic-shape model: every tier runs at its own side
+    monkeypatch.setattr(engine, "inference_side", lambda wf_key, tier: engine.SPEED_TIERS[tier])
+
+
+def noise(seed, side=64):
+    """A mask PNG cannot compress, so every entry costs about the same."""
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (side, side), dtype=np.uint8), "L")
+
+
+def test_key_is_stable_and_covers_its_inputs(monkeypatch):
+    key = engine.MaskCache.key("abc", "portrait", "max")
+    assert key == engine.MaskCache.key("abc", "portrait", "max")
+    assert key == engine.MaskCache.key("abc", "portrait")
+    others = {engine.MaskCache.key("abd", "portrait"),
+              engine.MaskCache.key("abc", "general"),
+              engine.MaskCache.key("abc", "portrait", "draft"),
+              engine.MaskCache.key("abc", "portrait", "standard")}
+    assert len(others) == 4 and key not in others
+    monkeypatch.setitem(engine.BG_WORKFLOWS["portrait"], "blur_radius", 2.0)
+    assert engine.MaskCache.key("abc", "portrait") != key
+
+
+def test_store_then_load_round_trip(tmp_path):
+    cache = engine.MaskCache(tmp_path)
+    key = engine.MaskCache.key("abc", "portrait")
+    assert cache.load(key) is None
+    mask = noise(0)
+    cache.store(key, mask)
+    loaded = cache.load(key)
+    assert loaded.mode == "L" and loaded.tobytes() == mask.tobytes()
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_eviction_trims_least_recently_used_to_90_percent(tmp_path):
+    keys = [engine.MaskCache.key(str(i), "portrait") for i in range(6)]
+    cache = engine.MaskCache(tmp_path)
+    for i, key in enumerate(keys[:5]):
+        cache.store(key, noise(i))
+        os.utime(cache._path(key), (1_000_000 + i, 1_000_000 + i))
+    assert cache.load(keys[0]) is not None  # A hit makes the oldest the newest
+    entry = cache.size()[1] / 5
+
+    cache = engine.MaskCache(tmp_path, max_bytes=int(entry * 5.5))
+    cache.store(keys[5], noise(5))
+    count, total = cache.size()
+    assert total <= cache.max_bytes * 0.9
+    assert count == 4  # Only as many as needed went
+    assert cache.load(keys[0]) is not None and cache.load(keys[5]) is not None
+    assert cache.load(keys[1]) is None and cache.load(keys[2]) is None
+
+
+def test_purge_removes_everything(tmp_path):
+    cache = engine.MaskCache(tmp_path / "masks")
+    keys = [engine.MaskCache.key(str(i), "portrait") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.store(key, noise(i))
+    stored = cache.size()
+    assert cache.purge() == stored and stored[0] == 3
+    assert cache.size() == (0, 0) and cache.load(keys[0]) is None
+    cache.store(keys[0], noise(0))  # Still usable afterwards
+    assert cache.size()[0] == 1
+    assert cache.purge()[0] == 1 and cache.purge() == (0, 0)
@@ -0,0 +1,90 @@
+"""Optimized ONNX graphs cached next to the model file."""
+
+import numpy as np
+import pytest
+
+import batch_resize_headshots as engine
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("rembg")
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+CPU = ["CPUExecutionProvider"]
+
+
+def make_model(path, scale):
+    """input * scale + 1, with the constant folding left for the optimizer."""
+    nodes = [helper.make_node("Add", ["a", "b"], ["ab"]),
+             helper.make_node("Mul", ["input", "ab"], ["output"])]
+    graph = helper.make_graph(
+        nodes, "model",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", 4])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch", 4])],
+        [numpy_helper.from_array(np.full(4, scale - 1, np.float32), "a"),
+         numpy_helper.from_array(np.ones(4, np.float32), "b")])
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8), path)
+    return path
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    path = make_model(tmp_path / "model.onnx", 2.0)
+    monkeypatch.setattr(engine, "_model_file", lambda name, quantized=False: path)
+    return path
+
+
+def run(session):
+    feed = {"input": np.ones((1, 4), np.float32)}
+    return session.inner_session.run(None, feed)[0]
+
+
+def cached_files(model):
+    return sorted((model.parent / "optimized").glob("*.onnx"))
+
+
+def test_first_load_writes_the_cache_and_later_loads_use_it(model):
+    first = run(engine._new_session("bria-rmbg", {}, CPU, use_cache=True))
+    files = cached_files(model)
+    assert len(files) == 1
+    mtime = files[0].stat().st_mtime_ns
+    second = run(engine._new_session("bria-rmbg", {}, CPU, use_cache=True))
+    assert np.array_equal(first, second) and first[0, 0] == 2.0
+    assert cached_files(model) == files and files[0].stat().st_mtime_ns == mtime
+    assert not list(model.parent.glob("optimized/*.tmp"))
+
+
+def test_cache_off_or_optimization_disabled_writes_nothing(model):
+    engine._new_session("bria-rmbg", {}, CPU, use_cache=False)
+    engine._new_session("bria-rmbg", {"graph_optimization_level": "disable"}, CPU, use_cache=True)
+    assert cached_files(model) == []
+
+
+def test_changed_model_gets_a_new_cache_entry(model):
+    engine._new_session("bria-rmbg", {}, CPU, use_cache=True)
+    make_model(model, 3.0)
+    session = engine._new_session("bria-rmbg", {}, CPU, use_cache=True)
+    assert run(session)[0, 0] == 3.0
+    assert len(cached_files(model)) == 2
+
+
+def test_cache_path_depends_on_optimization_level(model):
+    paths = {engine.optimized_model_path(model, {"graph_optimization_level": level}, CPU)
+             for level in ("basic", "extended", "all")}
+    assert len(paths) == 3
+
+
+def test_session_is_built_by_rembg(model):
+    from rembg.sessions import BriaRmBgSession
+
+    session = engine._new_session("bria-rmbg", {}, CPU, use_cache=True)
+    assert isinstance(session, BriaRmBgSession) and session.model_name == "bria-rmbg"
+    assert session.inner_session.get_providers() == CPU
+
+
+def test_cache_path_depends_on_architecture(model, monkeypatch):
+    paths = set()
+    for machine in ("x86_64", "arm64"):
+        monkeypatch.setattr(engine.platform, "machine", lambda machine=machine: machine)
+        paths.add(engine.optimized_model_path(model, {}, CPU))
+    assert len(paths) == 2
@@ -0,0 +1,42 @@
+"""Resize-only runs on a process pool."""
+
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+def photos(folder, n):
+    folder.mkdir()
+    for i in range(n):
+        Image.new("RGB", (300, 500), (20 * i, 80, 120)).save(folder / f"p{i}.jpg")
+    (folder / "bad.jpg").write_bytes(b"not an image")
+    return engine.find_images(folder)
+
+
+def test_parallel_run_matches_serial(tmp_path):
+    images = photos(tmp_path / "in", 6)
+    kw = dict(sizes=[(None, (120, 120))], workflows=[None], crop_mode="fill",
+              bg_str="#663399:#F77E2D", log=lambda m: None)
+    serial = engine.run_batch(images, tmp_path / "serial", workers=1, **kw)
+    parallel = engine.run_batch(images, tmp_path / "parallel", workers=2, **kw)
+    assert parallel["processed"] == serial["processed"] == 6
+    assert parallel["errors"] == 1 and parallel["failures"][0]["file"].endswith("bad.jpg")
+    for name in ("p0.jpg", "p5.jpg"):
+        assert (tmp_path / "parallel" / name).read_bytes() == (tmp_path / "serial" / name).read_bytes()
+
+
+def test_worker_cache_stats_reach_the_parent(tmp_path):
+    images = photos(tmp_path / "in", 6)
+    engine.run_batch(images, tmp_path / "out", [(None, (120, 120))], [None], crop_mode="fill",
+                     bg_str="#663399:#F77E2D", workers=2, log=lambda m: None)
+    cache = engine._background_cache
+    assert cache.hits + cache.misses == 6  # One lookup per decoded image
+
+
+def test_parallel_run_reports_status(tmp_path):
+    images = photos(tmp_path / "in", 4)
+    notes = []
+    engine.run_batch(images, tmp_path / "out", [(None, (120, 120))], [None],
+                     workers=2, log=lambda m: None, status=notes.append)
+    assert [n for n in notes if n.startswith("Processing")] == [
+        f"Processing {i}/5: {p.name}" for i, p in enumerate(images, 1)]
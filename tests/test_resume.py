@@ -0,0 +1,94 @@
+"""Run journal: resuming an interrupted run where it stopped."""
+
+import json
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+SIZES = [("small", (100, 100)), ("large", (200, 200))]
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def images(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    for i in range(5):
+        Image.new("RGB", (400, 600), (40 * i, 90, 160)).save(folder / f"p{i}.jpg")
+    return engine.find_images(folder)
+
+
+def interrupted_run(images, out, after):
+    """Start a run and stop it once `after` images are done."""
+    def progress(percent):
+        if percent and percent < 100 and percent >= after / len(images) * 100:
+            raise Interrupted
+    with pytest.raises(Interrupted):
+        engine.run_batch(images, out, SIZES, [None], quality=80, log=lambda m: None,
+                         progress=progress)
+
+
+def test_resume_finishes_the_remaining_images(images, tmp_path):
+    out = tmp_path / "out"
+    interrupted_run(images, out, 2)
+    assert (out / engine.JOURNAL_NAME).exists()
+    assert not (out / "small" / "p4.jpg").exists()
+
+    job = engine.resume_job(out)
+    assert job["quality"] == 80 and job["sizes"] == SIZES
+    summary = engine.run_batch(**job, resume=True, log=lambda m: None)
+    assert summary["resumed"] == 2 and summary["images"] == 5
+    assert summary["processed"] == 2 * 3  # Three images, two sizes each
+    assert not (out / engine.JOURNAL_NAME).exists()
+    assert engine.resume_job(out) is None
+    for folder, _ in SIZES:
+        assert sorted(p.name for p in (out / folder).glob("*.jpg")) == \
+            [f"p{i}.jpg" for i in range(5)]
+
+
+def test_partly_finished_image_redoes_only_missing_targets(images, tmp_path):
+    out = tmp_path / "out"
+    interrupted_run(images, out, 2)
+    journal = out / engine.JOURNAL_NAME
+    lines = journal.read_text(encoding="utf-8").splitlines()
+    # Forget one of p0's two targets, and leave a torn last line
+    p0 = [i for i, line in enumerate(lines) if '"file"' in line and "p0.jpg" in line]
+    del lines[p0[-1]]
+    journal.write_text("\n".join(lines) + '\n{"file": "trunc', encoding="utf-8")
+    kept = out / "small" / "p0.jpg"
+    mtime = kept.stat().st_mtime_ns
+
+    summary = engine.run_batch(**engine.resume_job(out), resume=True, log=lambda m: None)
+    assert summary["resumed"] == 1
+    assert summary["processed"] == 1 + 2 * 3
+    assert kept.stat().st_mtime_ns == mtime
+
+
+def test_finished_run_leaves_no_journal(images, tmp_path):
+    out = tmp_path / "out"
+    engine.run_batch(images, out, SIZES, [None], log=lambda m: None)
+    assert not (out / engine.JOURNAL_NAME).exists()
+
+
+def test_journal_read_skips_torn_lines(tmp_path):
+    journal = engine.RunJournal(tmp_path)
+    journal.begin({"quality": 90})
+    journal.add("a.jpg", ["k1", "k2"])
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"file": "b.jpg", "target": "k1"})[:10])
+    job, done = journal.read()
+    assert job == {"quality": 90}
+    assert done == {"a.jpg": {"k1", "k2"}}
+
+
+def test_no_partial_files_are_left_behind(images, tmp_path):
+    out = tmp_path / "out"
+    interrupted_run(images, out, 2)
+    engine.run_batch(**engine.resume_job(out), resume=True, log=lambda m: None)
+    assert not [p for p in out.rglob("*") if ".part" in p.name or p.name.endswith(".tmp")]
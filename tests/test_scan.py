@@ -0,0 +1,93 @@
+"""Input discovery: recursive scans, include/exclude globs and mirrored outputs."""
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "in"
+    for rel in ["top.jpg", "notes.txt", "ev1/day1/alice/a1.jpg", "ev1/day1/alice/a2_raw.jpg",
+                "ev1/day2/bob/b1.png", "ev2/raw/r.jpg", ".hidden/h.jpg", "ev1/.h.jpg",
+                "ev2/same.jpg", "ev1/same.jpg"]:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".txt":
+            path.write_text("x")
+        else:
+            Image.new("RGB", (300, 400), "teal").save(path)
+    return root
+
+
+def rels(root, paths):
+    return [p.relative_to(root).as_posix() for p in paths]
+
+
+def test_top_level_only_by_default(tree):
+    assert rels(tree, engine.scan_images(tree)) == ["top.jpg"]
+    assert engine.find_images(tree) == list(engine.scan_images(tree))
+
+
+def test_recursive_depth_first_files_before_folders(tree):
+    assert rels(tree, engine.scan_images(tree, recursive=True)) == [
+        "top.jpg", "ev1/same.jpg", "ev1/day1/alice/a1.jpg", "ev1/day1/alice/a2_raw.jpg",
+        "ev1/day2/bob/b1.png", "ev2/same.jpg", "ev2/raw/r.jpg"]
+
+
+def test_include_and_exclude(tree):
+    found = rels(tree, engine.scan_images(tree, True, include=["ev1/*"], exclude=["*_raw*"]))
+    assert found == ["ev1/same.jpg", "ev1/day1/alice/a1.jpg", "ev1/day2/bob/b1.png"]
+    # An excluded folder is pruned as a whole
+    found = rels(tree, engine.scan_images(tree, True, exclude=["ev1", "raw"]))
+    assert found == ["top.jpg", "ev2/same.jpg"]
+
+
+def test_skip_folder_is_not_read(tree):
+    found = rels(tree, engine.scan_images(tree, True, skip=[tree / "ev1"]))
+    assert found == ["top.jpg", "ev2/same.jpg", "ev2/raw/r.jpg"]
+
+
+def test_missing_root_raises(tmp_path):
+    with pytest.raises(OSError):
+        list(engine.scan_images(tmp_path / "nowhere", recursive=True))
+
+
+def test_output_stem_mirrors_subfolders(tree):
+    img = tree / "ev1" / "day1" / "alice" / "a1.jpg"
+    assert engine.output_stem(img) == "a1"
+    assert engine.output_stem(img, tree) == "ev1/day1/alice/a1"
+
+
+def test_recursive_run_mirrors_tree_and_skips_output_inside_input(tree):
+    out = tree / "out"
+    scan = engine.ImageScan(tree, recursive=True, exclude=["ev2/raw"], skip=[out])
+    summary = engine.run_batch(scan, out, [(None, (100, 100))], [None], log=lambda m: None)
+    assert summary["processed"] == 6 and summary["images"] == 6
+    assert sorted(rels(out, out.rglob("*.jpg"))) == [
+        "ev1/day1/alice/a1.jpg", "ev1/day1/alice/a2_raw.jpg", "ev1/day2/bob/b1.jpg",
+        "ev1/same.jpg", "ev2/same.jpg", "top.jpg"]
+    # The second run finds everything up to date, and doesn't pick up its own output
+    summary = engine.run_batch(scan, out, [(None, (100, 100))], [None], log=lambda m: None)
+    assert summary["skipped"] == 6 and summary["processed"] == 0
+
+
+def test_streamed_progress_starts_unknown(tree):
+    seen = []
+    scan = engine.ImageScan(tree, recursive=True)
+    engine.run_batch(scan, tree.parent / "out", [(None, (100, 100))], [None],
+                     log=lambda m: None, progress=seen.append)
+    assert seen[0] is None and seen[-1] == 100
+
+
+def test_scan_spec_round_trips_through_resume_job(tree, tmp_path):
+    scan = engine.ImageScan(tree, recursive=True, include=["ev1/*"], skip=[tmp_path / "x"])
+    journal = engine.RunJournal(tmp_path)
+    journal.begin({"output_base": str(tmp_path), "sizes": [[None, [100, 100]]],
+                   "workflows": [None], "scan": scan.spec()})
+    journal.close()
+    job = engine.resume_job(tmp_path)
+    assert isinstance(job["images"], engine.ImageScan)
+    assert job["images"].spec() == scan.spec()
+    assert list(job["images"]) == list(scan)
@@ -0,0 +1,120 @@
+"""HTTP service: request validation and metrics labels."""
+
+import http.client
+import io
+import json
+import threading
+import warnings
+import urllib.error
+import urllib.request
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+
+@pytest.fixture
+def service():
+    svc = engine.ResizerService(port=0, max_concurrent=1, queue_seconds=0.2, log=lambda m: None)
+    thread = threading.Thread(target=svc.serve_forever, daemon=True)
+    thread.start()
+    yield svc
+    svc.shutdown()
+    thread.join()
+
+
+def png(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "navy").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def post(service, path, body):
+    request = urllib.request.Request(service.address + path, data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_resize(service):
+    status, data = post(service, "/resize?size=120x80&format=PNG", png((300, 300)))
+    assert status == 200
+    assert Image.open(io.BytesIO(data)).size == (120, 80)
+
+
+def test_oversized_output_is_refused(service):
+    status, data = post(service, "/resize?size=60000x60000", png((300, 300)))
+    assert status == 400
+    assert "megapixels" in json.loads(data)["error"]
+
+
+@pytest.mark.parametrize("size", [(40, 40), (100, 100)])  # bomb warning, bomb error
+def test_decompression_bomb_is_refused(service, monkeypatch, size):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    status, _ = post(service, "/resize?size=20x20", png(size))
+    assert status == 400
+
+
+def test_unknown_paths_share_one_metrics_label(service):
+    for path in ("/a", "/b?x=1", "/c/d"):
+        assert post(service, path, b"x")[0] == 404
+    with urllib.request.urlopen(service.address + "/metrics") as response:
+        text = response.read().decode()
+    assert 'resizer_requests_total{endpoint="other",code="404"} 3' in text
+    assert '"/a"' not in text
+
+
+
+def test_service_leaves_warning_filters_alone(service):
+    assert not any(action == "error" and category is Image.DecompressionBombWarning
+                   for action, _, category, _, _ in warnings.filters)
+
+
+def test_non_numeric_content_length_is_400(service):
+    host, port = service.httpd.server_address[:2]
+    conn = http.client.HTTPConnection(host, port)
+    conn.putrequest("POST", "/resize")
+    conn.putheader("Content-Length", "lots")
+    conn.endheaders()
+    assert conn.getresponse().status == 400
+    conn.close()
+
+
+def test_body_is_not_read_without_a_slot(service, monkeypatch):
+    reads = []
+    original = engine._ServiceHandler.do_POST
+
+    def spy(handler):
+        read = handler.rfile.read
+        handler.rfile.read = lambda n: reads.append(n) or read(n)
+        original(handler)
+
+    monkeypatch.setattr(engine._ServiceHandler, "do_POST", spy)
+    with service.slot():  # The only slot is taken
+        status, _ = post(service, "/resize?size=50x50", png((100, 100)))
+    assert status == 503 and reads == []
+    assert post(service, "/resize?size=50x50", png((100, 100)))[0] == 200
+
+
+@pytest.mark.parametrize("query", ["quality=0", "quality=-5&format=WEBP", "quality=500",
+                                   "quality=high"])
+def test_quality_out_of_range_is_400(service, query):
+    assert post(service, f"/resize?size=50x50&{query}", png((100, 100)))[0] == 400
+
+
+def test_bg_paths_are_refused_without_touching_the_filesystem(service, tmp_path, monkeypatch):
+    existing = tmp_path / "backdrop.png"
+    existing.write_bytes(png((10, 10)))
+    checked = []
+    monkeypatch.setattr(engine.os.path, "isfile", lambda p: checked.append(p) or True)
+    answers = {post(service, f"/resize?size=50x50&bg={path}", png((100, 100)))[0]
+               for path in (existing, tmp_path / "missing.png")}
+    assert answers == {400} and checked == []
+
+
+@pytest.mark.parametrize("bg", ["%23663399", "%23663399:%23F77E2D:radial", "ONA+Teal"])
+def test_colour_and_preset_backgrounds(service, bg):
+    assert post(service, f"/resize?size=50x50&crop=fill&bg={bg}", png((100, 60)))[0] == 200
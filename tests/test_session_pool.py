@@ -0,0 +1,75 @@
+"""SessionPool: LRU budget, pinning and loading outside the lock."""
+
+import threading
+
+import batch_resize_headshots as engine
+
+
+def get(pool, key, size=60):
+    return pool.get(key, load=lambda: f"session {key}", cost=lambda: size)
+
+
+def test_lru_unloads_to_fit_budget():
+    pool = engine.SessionPool(100)
+    for key in "abab":
+        get(pool, key)
+    assert (pool.loads, pool.hits, pool.unloads) == (4, 0, 3)
+
+
+def test_pinned_sessions_stay_loaded():
+    # Two workflows that don't fit the budget together, alternated per batch
+    pool = engine.SessionPool(100)
+    pool.pin(["a", "b"])
+    for _ in range(4):
+        assert get(pool, "a") == "session a"
+        assert get(pool, "b") == "session b"
+    assert (pool.loads, pool.hits, pool.unloads) == (2, 6, 0)
+    pool.unpin(["a", "b"])
+    get(pool, "c")
+    assert pool.unloads == 2 and len(pool) == 1
+
+
+def test_session_larger_than_budget_still_loads():
+    pool = engine.SessionPool(100)
+    get(pool, "a")
+    assert get(pool, "big", size=500) == "session big"
+    assert len(pool) == 1
+
+
+def test_load_runs_outside_the_lock():
+    pool = engine.SessionPool(1000)
+    loading, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_load():
+        calls.append("a")
+        loading.set()
+        release.wait(5)
+        return "session a"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get("a", slow_load, lambda: 1)))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    assert loading.wait(5)
+    assert get(pool, "b") == "session b"  # Not blocked by a's load
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["session a", "session a"]
+    assert calls == ["a"]  # The second caller waited for the first load
+
+
+def test_failed_load_is_retried():
+    pool = engine.SessionPool(100)
+
+    def broken():
+        raise OSError("download failed")
+
+    try:
+        pool.get("a", broken, lambda: 60)
+    except OSError:
+        pass
+    assert get(pool, "a") == "session a"
+    assert pool._bytes == 60
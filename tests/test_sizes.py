@@ -0,0 +1,40 @@
+"""Several output sizes in one run: presets that share dimensions render once."""
+
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+SQUARE = ["400 × 400 — Headshot (Thumbnail)", "400 × 400 — X / Twitter Profile",
+          "400 × 400 — LinkedIn Profile"]
+WEB = "500 × 500 — Headshot (Web)"
+
+
+def test_shared_dimensions_render_once_and_copy(tmp_path, monkeypatch):
+    for i in range(2):
+        Image.new("RGB", (600, 900), (60 * i, 90, 160)).save(tmp_path / f"p{i}.jpg")
+    images = engine.find_images(tmp_path)
+    rendered = []
+    render = engine.render_image
+
+    def counting(img, width, height, *args, **kwargs):
+        rendered.append((width, height))
+        return render(img, width, height, *args, **kwargs)
+
+    monkeypatch.setattr(engine, "render_image", counting)
+    presets = engine.HeadshotResizerApp.SIZE_PRESETS
+    sizes = [(engine.size_folder_name(label), presets[label]) for label in SQUARE + [WEB]]
+    out = tmp_path / "out"
+    summary = engine.run_batch(images, out, sizes, [None], log=lambda m: None)
+
+    assert summary["images"] == 2 and summary["errors"] == 0
+    assert [(t["size"], len(t["folders"])) for t in summary["targets"]] == [("400x400", 3),
+                                                                            ("500x500", 1)]
+    assert sorted(rendered) == [(400, 400)] * 2 + [(500, 500)] * 2
+    for image in images:
+        copies = [(out / engine.size_folder_name(label) / image.name).read_bytes()
+                  for label in SQUARE]
+        assert copies[0] == copies[1] == copies[2]
+        with Image.open(out / engine.size_folder_name(SQUARE[0]) / image.name) as img:
+            assert img.size == (400, 400)
+        with Image.open(out / "500x500_Headshot_Web" / image.name) as img:
+            assert img.size == (500, 500)
@@ -0,0 +1,64 @@
+"""Speed tiers: the input side a model really runs at, and the mask cache key."""
+
+import numpy as np
+import pytest
+
+import batch_resize_headshots as engine
+
+onnx = pytest.importorskip("onnx")
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+
+def make_model(path, height, width):
+    """Identity model with the given input dims and a weight to skip over."""
+    weight = numpy_helper.from_array(np.zeros(4096, dtype=np.float32), "weight")
+    graph = helper.make_graph(
+        [helper.make_node("Identity", ["input"], ["output"])], "model",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", 3, height, width])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch", 3, height, width])],
+        [weight])
+    onnx.save(helper.make_model(graph), path)
+    return path
+
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    files = {"birefnet-portrait": make_model(tmp_path / "fixed.onnx", 1024, 1024),
+             "bria-rmbg": make_model(tmp_path / "dynamic.onnx", "h", "w")}
+    monkeypatch.setattr(engine, "_local_model_file", files.get)
+    monkeypatch.setattr(engine, "_input_dims_cache", {})
+    return files
+
+
+def test_onnx_input_dims(models):
+    assert engine.onnx_input_dims(models["birefnet-portrait"]) == [None, 3, 1024, 1024]
+    assert engine.onnx_input_dims(models["bria-rmbg"]) == [None, 3, None, None]
+
+
+def test_unreadable_model_has_no_dims(tmp_path):
+    (tmp_path / "bad.onnx").write_bytes(b"\xff\xff\xff")
+    assert engine.onnx_input_dims(tmp_path / "bad.onnx") is None
+    assert engine.onnx_input_dims(tmp_path / "missing.onnx") is None
+
+
+def test_fixed_shape_model_ignores_tiers(models):
+    assert {engine.inference_side("portrait", t) for t in engine.SPEED_TIERS} == {1024}
+    keys = {engine.MaskCache.key("abc", "portrait", t) for t in engine.SPEED_TIERS}
+    assert len(keys) == 1
+
+
+def test_dynamic_model_runs_at_tier_side(models):
+    assert [engine.inference_side("bria", t) for t in ("draft", "standard", "max")] == \
+        [512, 768, 1024]
+    keys = {engine.MaskCache.key("abc", "bria", t) for t in engine.SPEED_TIERS}
+    assert len(keys) == 3
+
+
+def test_side_is_resolved_without_downloading(models, monkeypatch):
+    def download(name, quantized=False):
+        raise AssertionError("inference_side must not download a model")
+
+    monkeypatch.setattr(engine, "_model_file", download)
+    del models["birefnet-portrait"]  # Not fetched yet: follows the tier like a dynamic model
+    assert engine.inference_side("portrait", "draft") == engine.tier_side("portrait", "draft")
+    engine.MaskCache.key("abc", "portrait", "draft")
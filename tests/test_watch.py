@@ -0,0 +1,103 @@
+"""FolderWatcher in polling mode: when arrivals are handed out."""
+
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import batch_resize_headshots as engine
+
+SETTLE = 0.4
+
+
+@pytest.fixture
+def watch(tmp_path, monkeypatch):
+    """Start a polling watcher on tmp_path; yields next_batch() -> (files, waited seconds)."""
+    def no_inotify(folder):
+        raise OSError("polling only")
+
+    monkeypatch.setattr(engine, "_Inotify", no_inotify)
+    stop = threading.Event()
+    watchers = []
+
+    def start(include_existing=True):
+        watcher = engine.FolderWatcher(tmp_path, settle=SETTLE, interval=0.05,
+                                       include_existing=include_existing)
+        assert watcher.mode == "polling"
+        watchers.append(watcher)
+        batches = watcher.batches(stop)
+
+        def next_batch(timeout=5.0):
+            timer = threading.Timer(timeout, stop.set)  # Never hang the suite
+            timer.start()
+            began = time.monotonic()
+            try:
+                files, _ = next(batches)
+            finally:
+                timer.cancel()
+            return [p.name for p in files], time.monotonic() - began
+
+        return next_batch
+
+    yield start
+    stop.set()
+    for watcher in watchers:
+        watcher.close()
+
+
+def photo(path, color="navy", size=(40, 40)):
+    Image.new("RGB", size, color).save(path)
+
+
+def test_file_is_handed_out_after_settling(tmp_path, watch):
+    next_batch = watch()
+    photo(tmp_path / "a.jpg")
+    files, waited = next_batch()
+    assert files == ["a.jpg"]
+    assert waited >= SETTLE * 0.9
+
+
+def test_growing_file_waits_until_it_stops_changing(tmp_path, watch):
+    next_batch = watch()
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"\xff\xd8")
+    written = []
+
+    def keep_writing():
+        for _ in range(4):
+            time.sleep(SETTLE / 2)
+            with path.open("ab") as f:
+                f.write(b"\0" * 100)
+        written.append(time.monotonic())
+
+    writer = threading.Thread(target=keep_writing)
+    writer.start()
+    files, _ = next_batch()
+    writer.join()
+    assert files == ["a.jpg"]
+    assert time.monotonic() - written[0] >= SETTLE * 0.9
+
+
+def test_overwritten_file_is_handed_out_again(tmp_path, watch):
+    next_batch = watch()
+    photo(tmp_path / "a.jpg")
+    assert next_batch()[0] == ["a.jpg"]
+    photo(tmp_path / "a.jpg", "olive", (60, 60))
+    assert next_batch()[0] == ["a.jpg"]
+
+
+def test_new_only_skips_files_already_there(tmp_path, watch):
+    photo(tmp_path / "old.jpg")
+    next_batch = watch(include_existing=False)
+    photo(tmp_path / "new.jpg")
+    assert next_batch()[0] == ["new.jpg"]
+    # An existing file still counts once it is overwritten
+    photo(tmp_path / "old.jpg", "olive", (60, 60))
+    assert next_batch()[0] == ["old.jpg"]
+
+
+def test_existing_files_come_first_by_default(tmp_path, watch):
+    photo(tmp_path / "old.jpg")
+    next_batch = watch()
+    assert next_batch()[0] == ["old.jpg"]
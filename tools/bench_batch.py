@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Batched inference benchmark: mask throughput against batch size.
+
+Predicts masks for the same set of images with each batch size and reports
+images/sec, so a workflow's "batch_size" in BG_WORKFLOWS can be set to the
+best value for the machine. Also checks that batched masks match one-by-one
+inference.
+
+    python tools/bench_batch.py
+    python tools/bench_batch.py --workflow bria --sizes 1 2 4 8 --images 16
+    python tools/bench_batch.py --photos path/to/folder
+
+Exits non-zero if a batched mask differs from the one-image result.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+from PIL import Image, ImageChops, ImageFilter  # noqa: E402
+
+
+def synthetic_photo(size, seed):
+    """Smooth noise with a bright ellipse, roughly a subject on a backdrop."""
+    noise = Image.effect_noise((size[0] // 40, size[1] // 40), 32 + seed).convert("RGB")
+    img = noise.resize(size, Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+    subject = Image.new("L", size, 0)
+    w, h = size
+    subject.paste(255, (w // 4, h // 5, 3 * w // 4, h))
+    return Image.composite(Image.new("RGB", size, (230, 200, 180)), img,
+                           subject.filter(ImageFilter.GaussianBlur(w // 20)))
+
+
+def load_photos(folder, count):
+    files = sorted(p for p in Path(folder).iterdir()
+                   if p.suffix.lower() in engine.SUPPORTED_EXTENSIONS)[:count]
+    return [engine.fix_orientation(Image.open(p)).convert("RGB") for p in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workflow", default="portrait", choices=sorted(engine.BG_WORKFLOWS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="batch sizes to try (default 1 2 4 8)")
+    parser.add_argument("--images", type=int, default=8,
+                        help="images per measurement (default 8)")
+    parser.add_argument("--photos", help="folder of images to use instead of synthetic ones")
+    args = parser.parse_args()
+
+    if args.photos:
+        images = load_photos(args.photos, args.images)
+    else:
+        images = [synthetic_photo((1365, 2048), i) for i in range(args.images)]
+    if not images:
+        print("No images to process", file=sys.stderr)
+        return 2
+
+    wf = engine.BG_WORKFLOWS[args.workflow]
+    print(f"{wf['label']}: {len(images)} images, configured batch_size {wf.get('batch_size', 1)}")
+    engine.predict_masks(images[:1], args.workflow)  # Load the model, warm the thread pool
+
+    configured = wf.get("batch_size", 1)
+    reference = None
+    mismatches = 0
+    print(f"{'batch':>5} {'time':>8} {'img/s':>7} {'vs 1':>6}")
+    try:
+        for size in args.sizes:
+            wf["batch_size"] = size
+            t0 = time.perf_counter()
+            masks = engine.predict_masks(images, args.workflow)
+            elapsed = time.perf_counter() - t0
+            if reference is None:
+                reference, base = masks, elapsed
+            else:
+                mismatches += sum(ImageChops.difference(a, b).getbbox() is not None
+                                  for a, b in zip(reference, masks))
+            print(f"{size:>5} {elapsed:>7.2f}s {len(images) / elapsed:>7.2f} "
+                  f"{base / elapsed:>5.2f}×")
+    finally:
+        wf["batch_size"] = configured
+
+    if mismatches:
+        print(f"\n{mismatches} masks differ from the batch-size {args.sizes[0]} result")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: model session load time with and without the
+optimized-graph cache.
+
+Each measurement runs in a fresh Python process, so nothing is warm except
+the OS file cache. "uncached" optimizes the graph in memory as before;
+"cached" loads the optimized graph saved by an earlier run (the first,
+untimed run writes it). The time to the first finished inference is shown
+too, since onnxruntime does part of its set-up on the first run.
+
+    python tools/bench_cold_start.py
+    python tools/bench_cold_start.py --workflow bria --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+
+
+def child(workflow_key, use_cache):
+    """Load one session in this process and print the timings as JSON."""
+    import onnxruntime  # noqa: F401 — keep import time out of the measurement
+    import rembg  # noqa: F401
+
+    wf = engine.BG_WORKFLOWS[workflow_key]
+    options, providers = engine.session_settings(workflow_key)
+    t0 = time.perf_counter()
+    session = engine._new_session(wf["model"], options, providers, use_cache=use_cache)
+    loaded = time.perf_counter()
+    session.inner_session.run(None, engine._dummy_feed(session))
+    first = time.perf_counter()
+    print(json.dumps({"load": loaded - t0, "first": first - t0}))
+
+
+def measure(workflow_key, use_cache):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", workflow_key, "--cache" if use_cache else "--no-cache"],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workflow", default="portrait", choices=sorted(engine.BG_WORKFLOWS))
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per mode (default 3)")
+    parser.add_argument("--child", metavar="WORKFLOW", help=argparse.SUPPRESS)
+    parser.add_argument("--cache", dest="use_cache", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.use_cache)
+        return 0
+
+    print(f"{engine.BG_WORKFLOWS[args.workflow]['label']}, {args.repeat} cold starts per mode")
+    measure(args.workflow, True)  # Writes the optimized graph if it isn't cached yet
+    results = {}
+    print(f"{'mode':<9} {'load':>8} {'to 1st run':>11}")
+    for label, use_cache in (("uncached", False), ("cached", True)):
+        runs = [measure(args.workflow, use_cache) for _ in range(args.repeat)]
+        load = statistics.median(r["load"] for r in runs)
+        first = statistics.median(r["first"] for r in runs)
+        results[label] = load
+        print(f"{label:<9} {load:>7.2f}s {first:>10.2f}s")
+    print(f"\nCached load is {results['uncached'] / results['cached']:.1f}× faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
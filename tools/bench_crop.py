@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Crop benchmark: crop-region-only resampling vs. resize-then-crop.
+
+Times crop_top / crop_center against the previous implementation (resize the
+whole source, then crop) on extreme aspect ratios, and reports how far the
+outputs differ.
+
+    python tools/bench_crop.py
+    python tools/bench_crop.py --photo path/to/portrait.jpg
+
+Exits non-zero if the mean difference exceeds --tolerance levels.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+from PIL import Image, ImageFilter, ImageStat, ImageChops  # noqa: E402
+
+CASES = [
+    ("portrait → LinkedIn Banner", (4000, 6000), (1584, 396)),
+    ("portrait → Large Leaderboard", (4000, 6000), (970, 90)),
+    ("portrait → Mobile Leaderboard", (4000, 6000), (320, 50)),
+    ("landscape → Wide Skyscraper", (6000, 4000), (160, 600)),
+    ("landscape → Story", (6000, 4000), (1080, 1920)),
+    ("portrait → Headshot", (4000, 6000), (500, 500)),
+]
+
+
+def reference_crop(img, target_w, target_h, top_align):
+    """The resize-then-crop implementation these modes used before."""
+    ratio = max(target_w / img.width, target_h / img.height)
+    new_w = int(img.width * ratio)
+    new_h = int(img.height * ratio)
+    img = img.resize((new_w, new_h), Image.LANCZOS)
+    left = (new_w - target_w) // 2
+    top = 0 if top_align else (new_h - target_h) // 2
+    return img.crop((left, top, left + target_w, top + target_h))
+
+
+def synthetic_photo(size):
+    """Smooth noise, roughly the frequency content of a defocused backdrop."""
+    noise = Image.effect_noise((size[0] // 40, size[1] // 40), 64).convert("RGB")
+    return noise.resize(size, Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--photo", help="use this image instead of synthetic sources")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="max allowed mean per-channel difference (default 1.0)")
+    args = parser.parse_args()
+
+    photo = engine.fix_orientation(Image.open(args.photo)).convert("RGB") if args.photo else None
+    worst_mean = 0.0
+    print(f"{'case':<31} {'mode':<7} {'old':>8} {'new':>8} {'speedup':>8} {'max Δ':>6} {'mean Δ':>7}")
+    for label, src_size, (tw, th) in CASES:
+        src = photo if photo else synthetic_photo(src_size)
+        if photo and src_size[0] > src_size[1]:
+            src = src.transpose(Image.Transpose.ROTATE_90)
+        for mode, fn, top_align in (("top", engine.crop_top, True),
+                                    ("center", engine.crop_center, False)):
+            old_t, old = timed(reference_crop, src, tw, th, top_align)
+            new_t, new = timed(fn, src, tw, th)
+            diff = ImageChops.difference(old, new)
+            max_d = max(hi for _, hi in diff.getextrema())
+            mean_d = sum(ImageStat.Stat(diff).mean) / 3
+            worst_mean = max(worst_mean, mean_d)
+            print(f"{label:<31} {mode:<7} {old_t:>7.3f}s {new_t:>7.3f}s "
+                  f"{old_t / new_t:>7.1f}× {max_d:>6} {mean_d:>7.3f}")
+    print(f"\nWorst mean difference: {worst_mean:.3f} (tolerance {args.tolerance})")
+    return 0 if worst_mean <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Gradient engine check + benchmark.
+
+Compares the vectorized create_gradient() against the per-pixel reference
+renderer for every direction, then times both on the large size presets.
+
+    python tools/bench_gradient.py            # accuracy + timings
+    python tools/bench_gradient.py --quick    # accuracy only (small canvases)
+
+Exits non-zero if any channel differs by more than --tolerance.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+from PIL import ImageChops  # noqa: E402
+
+STOP_SETS = {
+    "2-stop": ["#663399", "#F77E2D"],
+    "3-stop": ["#1D4BB7", "#DFE7EF", "#1D4BB7"],
+    "5-stop": ["#000000", "#FF0000", "#00FF00", "#0000FF", "#FFFFFF"],
+}
+ACCURACY_SIZES = [(1, 1), (2, 3), (97, 61), (500, 500), (728, 90)]
+BENCH_SIZES = [(1584, 396), (1920, 1080), (2560, 1440)]
+
+
+def max_channel_diff(a, b):
+    return max(hi for _, hi in ImageChops.difference(a, b).getextrema())
+
+
+def check_accuracy(tolerance):
+    worst = 0
+    for label, stops in STOP_SETS.items():
+        colors = [engine.hex_to_rgb(c) for c in stops]
+        for direction in sorted(engine.GRADIENT_DIRECTIONS):
+            for w, h in ACCURACY_SIZES:
+                fast = engine.create_gradient(w, h, colors, direction)
+                ref = engine._create_gradient_python(w, h, colors, direction)
+                diff = max_channel_diff(fast, ref)
+                worst = max(worst, diff)
+                if diff > tolerance:
+                    print(f"  ✗ {label} {direction} {w}×{h}: max diff {diff}")
+    print(f"Accuracy: max channel difference {worst} (tolerance {tolerance})")
+    return worst <= tolerance
+
+
+def bench():
+    colors = [engine.hex_to_rgb(c) for c in STOP_SETS["3-stop"]]
+    print(f"\n{'size':>11}  {'direction':<9} {'reference':>10} {'vectorized':>11} {'speedup':>8}")
+    for w, h in BENCH_SIZES:
+        for direction in ("diagonal", "radial"):
+            t0 = time.perf_counter()
+            engine._create_gradient_python(w, h, colors, direction)
+            ref = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            engine.create_gradient(w, h, colors, direction)
+            fast = time.perf_counter() - t0
+            print(f"{w:>5}×{h:<5}  {direction:<9} {ref:>9.2f}s {fast:>10.4f}s {ref / fast:>7.0f}×")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tolerance", type=int, default=1,
+                        help="max allowed per-channel difference (default 1)")
+    parser.add_argument("--quick", action="store_true", help="skip the timing run")
+    args = parser.parse_args()
+
+    if engine.np is None:
+        print("numpy is not installed — create_gradient is using the reference renderer.")
+        return 1
+    ok = check_accuracy(args.tolerance)
+    if not args.quick:
+        bench()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
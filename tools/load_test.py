@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Load test for the HTTP service: latency and throughput under concurrency.
+
+Start the service first (with --no-mask-cache to measure inference rather
+than cache hits, since the same photos are sent repeatedly), then point this
+at it:
+
+    python batch_resize_headshots.py --serve --workflow portrait --no-mask-cache
+    python tools/load_test.py --endpoint cutout --requests 64 --concurrency 8
+    python tools/load_test.py --photos path/to/folder --size 1080x1080 --bg "#663399:#F77E2D"
+
+Each request uploads one photo (synthetic ones unless --photos is given).
+Reports requests/sec, latency percentiles and status codes, plus how many
+masks each model run served, read from /metrics before and after.
+
+Exits non-zero if any request failed.
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+from bench_batch import synthetic_photo  # noqa: E402
+
+
+def load_bodies(folder, count):
+    if folder:
+        files = sorted(p for p in Path(folder).iterdir()
+                       if p.suffix.lower() in engine.SUPPORTED_EXTENSIONS)[:count]
+        return [p.read_bytes() for p in files]
+    bodies = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        synthetic_photo((1365, 2048), i).save(buffer, "JPEG", quality=90)
+        bodies.append(buffer.getvalue())
+    return bodies
+
+
+def metrics(base_url):
+    """{name: value} of the service's unlabelled /metrics samples."""
+    with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as response:
+        text = response.read().decode()
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#") and "{" not in line:
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def post(url, body):
+    """(status, seconds) of one upload."""
+    request = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0  # Connection refused, reset or timed out
+    return status, time.perf_counter() - t0
+
+
+def percentile(values, share):
+    return sorted(values)[min(len(values) - 1, int(share * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=f"http://{engine.SERVE_HOST}:{engine.SERVE_PORT}",
+                        help="service address (default %(default)s)")
+    parser.add_argument("--endpoint", choices=["resize", "cutout"], default="resize")
+    parser.add_argument("--requests", type=int, default=32, help="requests to send (default 32)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="requests in flight at once (default 8)")
+    parser.add_argument("--photos", help="folder of images to upload instead of synthetic ones")
+    parser.add_argument("--size", default="500x500", help="output size (default 500x500)")
+    parser.add_argument("--crop", default="top", choices=["top", "center", "fill"])
+    parser.add_argument("--format", default="JPEG", choices=list(engine.OUTPUT_EXTENSIONS))
+    parser.add_argument("--bg", default=None, help="background spec (default: the service's)")
+    parser.add_argument("--workflow", default="portrait", choices=sorted(engine.BG_WORKFLOWS),
+                        help="cutout workflow (default portrait)")
+    parser.add_argument("--tier", default="auto", choices=["auto"] + list(engine.SPEED_TIERS))
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    try:
+        before = metrics(base_url)
+    except OSError as e:
+        print(f"No service at {base_url} ({e}). Start it with:\n"
+              f"  python batch_resize_headshots.py --serve", file=sys.stderr)
+        return 2
+    bodies = load_bodies(args.photos, min(args.requests, 16))
+    if not bodies:
+        print(f"No images found in {args.photos}", file=sys.stderr)
+        return 2
+
+    params = {"size": args.size, "crop": args.crop, "format": args.format}
+    if args.bg:
+        params["bg"] = args.bg
+    if args.endpoint == "cutout":
+        params.update(workflow=args.workflow, tier=args.tier)
+    url = f"{base_url}/{args.endpoint}?{urlencode(params)}"
+
+    print(f"POST /{args.endpoint}: {args.requests} requests, {args.concurrency} concurrent, "
+          f"{len(bodies)} distinct images")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda i: post(url, bodies[i % len(bodies)]), range(args.requests)))
+    elapsed = time.perf_counter() - t0
+    after = metrics(base_url)
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = [seconds for status, seconds in results if status == 200]
+    print(f"  throughput {args.requests / elapsed:.2f} req/s ({elapsed:.2f}s total)")
+    if latencies:
+        print(f"  latency    p50 {percentile(latencies, 0.5):.3f}s  p95 {percentile(latencies, 0.95):.3f}s"
+              f"  p99 {percentile(latencies, 0.99):.3f}s  mean {statistics.mean(latencies):.3f}s")
+    print("  status     " + ", ".join(f"{code or 'no response'}: {n}"
+                                      for code, n in sorted(statuses.items())))
+    runs = after.get("resizer_inference_batches_total", 0) - before.get("resizer_inference_batches_total", 0)
+    masks = after.get("resizer_inference_images_total", 0) - before.get("resizer_inference_images_total", 0)
+    if runs:
+        print(f"  batching   {masks:.0f} masks in {runs:.0f} batches ({masks / runs:.2f} per batch)")
+    return 0 if statuses.get(200, 0) == args.requests else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
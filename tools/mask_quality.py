@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Mask quality: compare a workflow's masks against a reference workflow.
+
+For every photo in a folder, predicts the mask with both workflows (by
+default each *_fast INT8 workflow against its FP32 original) and reports
+
+  IoU         intersection over union of the two masks thresholded at 50%
+  edge error  mean absolute alpha difference (0–255) within --band pixels
+              of the reference mask's edge, where quantization shows first
+
+plus the time each workflow spent predicting.
+
+    python tools/mask_quality.py photos/
+    python tools/mask_quality.py photos/ --pairs portrait_fast:portrait --min-iou 0.98
+    python tools/mask_quality.py photos/ --pairs portrait@draft:portrait portrait@standard:portrait
+
+A workflow may carry a speed tier as WORKFLOW@TIER (default max).
+
+Exits non-zero if any pair's mean IoU is below --min-iou.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+from PIL import Image, ImageChops, ImageFilter, ImageStat  # noqa: E402
+
+DEFAULT_PAIRS = [f"{key}:{wf_key}" for key in engine.BG_WORKFLOWS
+                 for wf_key in engine.BG_WORKFLOWS if key == f"{wf_key}_fast"]
+
+
+def iou(a, b):
+    """IoU of two L masks thresholded at 128 (1.0 when both are empty)."""
+    a = a.point(lambda v: 255 if v >= 128 else 0)
+    b = b.point(lambda v: 255 if v >= 128 else 0)
+    inter = ImageStat.Stat(ImageChops.multiply(a, b)).sum[0]
+    union = ImageStat.Stat(ImageChops.lighter(a, b)).sum[0]
+    return inter / union if union else 1.0
+
+
+def edge_error(reference, mask, band):
+    """Mean |alpha difference| within band px of the reference mask's edge."""
+    binary = reference.point(lambda v: 255 if v >= 128 else 0)
+    size = 2 * band + 1
+    edges = ImageChops.subtract(binary.filter(ImageFilter.MaxFilter(size)),
+                                binary.filter(ImageFilter.MinFilter(size)))
+    pixels = ImageStat.Stat(edges).sum[0] / 255
+    if not pixels:
+        return 0.0
+    diff = ImageChops.multiply(ImageChops.difference(reference, mask), edges)
+    return ImageStat.Stat(diff).sum[0] / pixels
+
+
+def timed_masks(images, spec):
+    """Masks for a WORKFLOW[@TIER] spec, at the reference geometry, and the time taken."""
+    workflow_key, _, tier = spec.partition("@")
+    t0 = time.perf_counter()
+    masks = engine.predict_masks(images, workflow_key, tier or "max")
+    elapsed = time.perf_counter() - t0
+    # Lower tiers return smaller masks; compare them at the max-tier size
+    sizes = [engine._inference_view(img).size for img in images]
+    return [m if m.size == size else m.resize(size, Image.BILINEAR)
+            for m, size in zip(masks, sizes)], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("photos", help="folder of photos to compare on")
+    parser.add_argument("--pairs", nargs="+", default=DEFAULT_PAIRS, metavar="TEST:REFERENCE",
+                        help=f"workflow pairs (default: {' '.join(DEFAULT_PAIRS)})")
+    parser.add_argument("--band", type=int, default=4,
+                        help="edge band half-width in mask pixels (default 4)")
+    parser.add_argument("--min-iou", type=float, default=0.95,
+                        help="lowest acceptable mean IoU (default 0.95)")
+    args = parser.parse_args()
+
+    files = sorted(p for p in Path(args.photos).iterdir()
+                   if p.suffix.lower() in engine.SUPPORTED_EXTENSIONS)
+    images, names = [], []
+    for path in files:
+        try:
+            images.append(engine.fix_orientation(Image.open(path)).convert("RGB"))
+            names.append(path.name)
+        except OSError as e:
+            print(f"Skipping {path.name}: {e}")
+    if not images:
+        print(f"No images found in {args.photos}", file=sys.stderr)
+        return 2
+
+    failed = False
+    for pair in args.pairs:
+        test, reference = pair.split(":")
+        ref_masks, ref_time = timed_masks(images, reference)
+        test_masks, test_time = timed_masks(images, test)
+        scores = [(iou(r, t), edge_error(r, t, args.band)) for r, t in zip(ref_masks, test_masks)]
+        mean_iou = sum(s[0] for s in scores) / len(scores)
+        mean_edge = sum(s[1] for s in scores) / len(scores)
+        worst = min(range(len(scores)), key=lambda i: scores[i][0])
+        print(f"{test} vs {reference} ({len(images)} images)")
+        print(f"  IoU        mean {mean_iou:.4f}, worst {scores[worst][0]:.4f} ({names[worst]})")
+        print(f"  edge error mean {mean_edge:.1f} / 255")
+        print(f"  time       {test_time:.2f}s vs {ref_time:.2f}s ({ref_time / test_time:.2f}× faster)")
+        failed |= mean_iou < args.min_iou
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Make the INT8 models used by the "fast" background-removal workflows.
+
+Quantizes each rembg model (downloading it first if needed) and writes
+<model>.int8.onnx next to it, where the *_fast entries in BG_WORKFLOWS look
+for it. Dynamic quantization needs no data; static quantization calibrates
+activation ranges on a folder of representative photos and is usually both
+faster and closer to the FP32 masks.
+
+    python tools/quantize_models.py                    # every model, dynamic
+    python tools/quantize_models.py bria-rmbg --static --calibration photos/
+
+Check the result with tools/mask_quality.py before relying on it.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_resize_headshots as engine  # noqa: E402
+from onnxruntime.quantization import (  # noqa: E402
+    CalibrationDataReader, QuantType, quantize_dynamic, quantize_static)
+from onnxruntime.quantization.shape_inference import quant_pre_process  # noqa: E402
+from PIL import Image  # noqa: E402
+
+MODELS = sorted({wf["model"] for wf in engine.BG_WORKFLOWS.values()})
+
+
+class PhotoReader(CalibrationDataReader):
+    """Calibration data for quantize_static: the model's own input for each photo."""
+
+    def __init__(self, model_name, folder, limit):
+        mean, std, size, _ = engine._BATCHED_MODELS[model_name]
+        session = engine._new_session(model_name, {"graph_optimization_level": "disable"},
+                                      ["CPUExecutionProvider"], use_cache=False)
+        self._feeds = []
+        files = sorted(p for p in Path(folder).iterdir()
+                       if p.suffix.lower() in engine.SUPPORTED_EXTENSIONS)[:limit]
+        for path in files:
+            img = engine.fix_orientation(Image.open(path)).convert("RGB")
+            self._feeds.append(session.normalize(engine._inference_view(img), mean, std, size))
+        if not self._feeds:
+            raise SystemExit(f"No images found in {folder}")
+        self._iter = iter(self._feeds)
+
+    def get_next(self):
+        return next(self._iter, None)
+
+    def rewind(self):
+        self._iter = iter(self._feeds)
+
+
+def quantize(model_name, static=False, calibration=None, limit=32):
+    source = engine._model_file(model_name)
+    target = engine.quantized_model_path(source)
+    tmp = target.with_name(target.name + ".tmp")
+    with tempfile.TemporaryDirectory() as work:
+        prepared = Path(work) / "prepared.onnx"
+        try:
+            quant_pre_process(str(source), str(prepared), skip_symbolic_shape=True)
+        except Exception as e:
+            print(f"  pre-processing skipped ({e})")
+            prepared = source
+        if static:
+            reader = PhotoReader(model_name, calibration, limit)
+            quantize_static(str(prepared), str(tmp), reader,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+        else:
+            quantize_dynamic(str(prepared), str(tmp), weight_type=QuantType.QUInt8)
+    tmp.replace(target)
+    return source, target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("models", nargs="*", metavar="MODEL",
+                        help=f"models to quantize (default: all of {', '.join(MODELS)})")
+    parser.add_argument("--static", action="store_true",
+                        help="static quantization calibrated on --calibration photos")
+    parser.add_argument("--calibration", metavar="DIR", help="folder of calibration photos")
+    parser.add_argument("--limit", type=int, default=32,
+                        help="calibration photos to use (default 32)")
+    args = parser.parse_args()
+    if args.static and not args.calibration:
+        parser.error("--static needs --calibration DIR")
+    unknown = set(args.models) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown model: {', '.join(sorted(unknown))} (choose from {', '.join(MODELS)})")
+
+    for model_name in args.models or MODELS:
+        print(f"{model_name}:")
+        t0 = time.perf_counter()
+        source, target = quantize(model_name, args.static, args.calibration, args.limit)
+        print(f"  {source.stat().st_size / 1_048_576:.1f} MB → "
+              f"{target.stat().st_size / 1_048_576:.1f} MB in {time.perf_counter() - t0:.0f}s"
+              f"\n  {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())